@@ -1,112 +1,307 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, make_response, stream_with_context
+from markupsafe import Markup, escape
+from functools import wraps
 import datetime
+import hashlib
+import json
+import zlib
 import pytz
+from cache import ResponseCache
+from metrics import render_prometheus, update_metric_families
 from database import NewsDatabase
+from notifier import ChangeNotifier
+import profiling
 from content_filter import ContentFilter
-from scheduler import NewsfeedScheduler
+from scheduler import source_schedule
 import config
 
 app = Flask(__name__)
 app.secret_key = config.FLASK_SECRET_KEY
+profiling.init_app(app)
 
 # Initialize components
 db = NewsDatabase()
 content_filter = ContentFilter()
-scheduler = NewsfeedScheduler()
+response_cache = ResponseCache(db.get_generation)
+change_notifier = ChangeNotifier(db.get_change_watermark)
+
+# Request parameters that select what a cached view returns
+CACHE_PARAMS = ('category', 'days', 'limit', 'page', 'relevance', 'q', 'cursor', 'dir')
+
+def cached(view):
+    """Serve a view from the response cache and answer If-None-Match with 304"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (
+            request.endpoint,
+            tuple(sorted(kwargs.items())),
+            tuple((name, request.args.get(name).strip()) for name in CACHE_PARAMS if name in request.args)
+        )
+        
+        entry = response_cache.get(key)
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            # Redirects and errors are never cached
+            if response.status_code != 200:
+                return response
+            data = response.get_data()
+            entry = (data, response.mimetype, hashlib.sha1(data).hexdigest())
+            response_cache.set(key, entry)
+        
+        data, mimetype, etag = entry
+        response = app.response_class(data, mimetype=mimetype)
+        response.set_etag(etag)
+        return response.make_conditional(request)
+    return wrapper
+
+def get_scheduler_status():
+    """Describe when the next source is due and the latest update job run by the worker"""
+    job = db.get_latest_job('update')
+    due_times = [source['next_due'] for source in source_schedule(db) if source['next_due']]
+    return {
+        'is_running': bool(job and job['status'] == 'running'),
+        'next_run': min(due_times) if due_times else None,
+        'timezone': str(config.TIMEZONE),
+        'last_job': job
+    }
 
 @app.route('/')
+@cached
 def index():
     """Main newsfeed page"""
     # Get filter parameters
     category = request.args.get('category', 'all')
     days = int(request.args.get('days', 30))  # Extended from 7 to 30 days
     limit = int(request.args.get('limit', 12))  # Reduced limit for better pagination
-    page = int(request.args.get('page', 1))
     relevance = float(request.args.get('relevance', 0.8))
+    cursor = request.args.get('cursor')
+    direction = request.args.get('dir', 'next')
     
-    # Calculate offset for pagination
-    offset = (page - 1) * limit
-    
-    # Get articles with pagination
-    if category == 'all':
-        articles = db.get_articles(limit=limit, days_back=days, offset=offset, min_relevance=relevance)
-    else:
-        articles = db.get_articles(limit=limit, category=category, days_back=days, offset=offset, min_relevance=relevance)
-    
-    # Get total count for pagination
-    total_articles = db.get_articles_count(category=category if category != 'all' else None, days_back=days)
-    total_pages = (total_articles + limit - 1) // limit
+    # Get the page and the total matching count in one query
+    filters = dict(limit=limit, category=category if category != 'all' else None,
+                   days_back=days, min_relevance=relevance, include_total=True)
+    try:
+        page = db.get_articles_page(cursor=cursor, direction=direction, **filters)
+    except ValueError:
+        # Stale or tampered cursor, start from the first page
+        page = db.get_articles_page(**filters)
+    total_articles = page['total']
     
     # Get statistics
     stats = db.get_stats()
     
-    # Get scheduler status
-    scheduler_status = scheduler.get_scheduler_status()
-    
     return render_template('index.html', 
-                         articles=articles, 
+                         articles=page['articles'], 
                          stats=stats,
-                         scheduler_status=scheduler_status,
                          current_category=category,
                          current_days=days,
-                         current_page=page,
-                         total_pages=total_pages,
+                         next_cursor=page['next_cursor'],
+                         prev_cursor=page['prev_cursor'],
                          total_articles=total_articles,
                          current_relevance=relevance,
                          datetime=datetime)
 
 @app.route('/api/articles')
+@cached
 def api_articles():
-    """API endpoint for articles"""
+    """
+    API endpoint for articles
+    Pass cursor (empty for the first page) to get {'articles', 'next_cursor', 'prev_cursor'}
+    using keyset pagination; without it the legacy page/limit array is returned
+    """
     category = request.args.get('category')
     days = int(request.args.get('days', 30))  # Extended from 7 to 30 days
     limit = int(request.args.get('limit', 12))
+    
+    if category == 'all':
+        category = None
+    
+    if 'cursor' in request.args:
+        try:
+            page = db.get_articles_page(limit=limit, category=category, days_back=days,
+                                        cursor=request.args.get('cursor') or None,
+                                        direction=request.args.get('dir', 'next'))
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        return jsonify(page)
+    
     page = int(request.args.get('page', 1))
     offset = (page - 1) * limit
-    
-    if category and category != 'all':
-        articles = db.get_articles(limit=limit, category=category, days_back=days, offset=offset)
-    else:
-        articles = db.get_articles(limit=limit, days_back=days, offset=offset)
+    articles = db.get_articles(limit=limit, category=category, days_back=days, offset=offset)
     
     return jsonify(articles)
 
+@app.route('/api/articles/export')
+def api_articles_export():
+    """
+    Stream the archive as newline-delimited JSON, oldest first
+    since_id returns only articles with a larger id (use the last id seen as a watermark),
+    since only those created at or after a timestamp; gzip is used if the client accepts it
+    """
+    try:
+        since_id = int(request.args.get('since_id', 0))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'since_id must be an integer'}), 400
+    since = request.args.get('since')
+    if since and db.normalize_timestamp(since) is None:
+        return jsonify({'status': 'error', 'message': 'since must be a timestamp such as 2024-01-31T12:00:00'}), 400
+    use_gzip = request.accept_encodings['gzip'] > 0
+    
+    def generate():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+        batch = []
+        
+        for article in db.iter_articles(since_id=since_id, since=since):
+            batch.append(json.dumps(article, default=str))
+            if len(batch) >= 500:
+                chunk = ('\n'.join(batch) + '\n').encode()
+                batch = []
+                # Sync-flush so each batch reaches the client as it is produced
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else chunk
+        
+        chunk = ('\n'.join(batch) + '\n').encode() if batch else b''
+        yield compressor.compress(chunk) + compressor.flush() if compressor else chunk
+    
+    headers = {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'} if use_gzip else {}
+    return app.response_class(stream_with_context(generate()),
+                              mimetype='application/x-ndjson', headers=headers)
+
+@app.route('/api/articles/changes')
+def api_article_changes():
+    """
+    Articles inserted or deleted after the since watermark, oldest first
+    Pass the returned watermark as the next since; wait=<seconds> long-polls until something changes
+    """
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', 500))
+        wait = min(float(request.args.get('wait', 0)), config.CHANGES_MAX_WAIT)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'since, limit and wait must be numbers'}), 400
+    
+    if wait > 0:
+        change_notifier.wait_for_change(since, wait)
+    
+    return jsonify(db.get_changes(since, limit))
+
+@app.route('/api/articles/changes/stream')
+def api_article_changes_stream():
+    """
+    Server-Sent Events stream with a 'changes' event each time the change watermark advances,
+    carrying the number of articles inserted, updated and deleted since the previous event
+    Starts from Last-Event-ID or since if given, otherwise from the current watermark
+    """
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.args.get('since') or
+                    change_notifier.current())
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'since must be an integer'}), 400
+    
+    def generate(since):
+        yield 'retry: 5000\n\n'
+        while True:
+            watermark = change_notifier.wait_for_change(since, config.SSE_KEEPALIVE)
+            if watermark > since:
+                data = json.dumps({'since': since, 'watermark': watermark,
+                                   **db.count_changes(since, watermark)})
+                yield f'id: {watermark}\nevent: changes\ndata: {data}\n\n'
+                since = watermark
+            else:
+                yield ': keepalive\n\n'
+    
+    return app.response_class(stream_with_context(generate(since)), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/stats')
+@cached
 def api_stats():
     """API endpoint for statistics"""
     stats = db.get_stats()
+    if 'articles_by_category' in stats:
+        # jsonify sorts keys, which fails on None next to strings; json renders None as "null" anyway
+        stats['articles_by_category'] = {'null' if category is None else category: count
+                                         for category, count in stats['articles_by_category'].items()}
     return jsonify(stats)
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """
+    Prometheus metrics: update run and per-source totals from the fetch_log rollups, written by the worker,
+    plus this process's response cache counters
+    """
+    families = update_metric_families(db.get_fetch_metrics())
+    cache_stats = response_cache.stats()
+    families.extend([
+        ('pasture_response_cache_lookups_total', 'counter', 'Response cache lookups by result',
+         [({'result': 'hit'}, cache_stats['hits']), ({'result': 'miss'}, cache_stats['misses'])]),
+        ('pasture_response_cache_entries', 'gauge', 'Responses held in the cache',
+         [({}, cache_stats['entries'])]),
+    ])
+    return app.response_class(render_prometheus(families), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/sources')
+def api_sources():
+    """Polling state of each source: publish rate (articles/hour), interval in seconds and next due time (UTC)"""
+    return jsonify(source_schedule(db))
+
+@app.route('/api/status')
+def api_status():
+    """Next source poll and latest update job, fetched by the page footer since cached pages cannot carry them"""
+    return jsonify(get_scheduler_status())
+
+@app.route('/api/cache')
+def api_cache():
+    """API endpoint for response cache hit/miss counters"""
+    return jsonify(response_cache.stats())
+
 @app.route('/api/update', methods=['POST'])
 def manual_update():
-    """Trigger a manual newsfeed update"""
+    """
+    Queue a manual newsfeed update for the worker and return its job at once
+    A request made while an update is queued or running joins that job instead of starting another
+    """
     try:
-        scheduler.run_manual_update()
-        return jsonify({'status': 'success', 'message': 'Newsfeed updated successfully'})
+        job = db.enqueue_job('update')
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
+    
+    return jsonify({
+        'status': 'accepted',
+        'job_id': job['id'],
+        'job_status': job['status'],
+        'coalesced': job['coalesced'],
+        'status_url': url_for('update_status', job_id=job['id'])
+    }), 202
+
+@app.route('/api/update/<int:job_id>')
+def update_status(job_id):
+    """Progress of a queued update: status is queued, running, succeeded or failed"""
+    job = db.get_job(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Unknown job'}), 404
+    return jsonify(job)
 
 @app.route('/search')
+@cached
 def search():
     """Search articles by keywords"""
     query = request.args.get('q', '')
     if not query:
         return redirect(url_for('index'))
     
-    # Search in database
-    articles = db.get_articles_by_keywords([query], limit=50)
+    # Search the full-text index
+    articles = db.search_articles(query, limit=50)
     stats = db.get_stats()
-    scheduler_status = scheduler.get_scheduler_status()
     
     return render_template(
         'search.html',
         articles=articles,
         query=query,
-        stats=stats,
-        scheduler_status=scheduler_status
+        stats=stats
     )
 
 @app.route('/category/<category>')
+@cached
 def category(category):
     """Filter articles by category"""
     articles = db.get_articles(category=category, limit=50)
@@ -133,6 +328,13 @@ def format_date(date_string):
     except Exception:
         return date_string
 
+@app.template_filter('highlight')
+def highlight(snippet):
+    """Escape a search snippet and mark up the matched terms"""
+    escaped = str(escape(snippet or ''))
+    return Markup(escaped.replace(NewsDatabase.SNIPPET_START, '<mark>')
+                         .replace(NewsDatabase.SNIPPET_END, '</mark>'))
+
 @app.template_filter('truncate')
 def truncate(text, length=200):
     """Truncate text to specified length"""
@@ -159,9 +361,5 @@ def inject_categories():
     }
 
 if __name__ == '__main__':
-    # Start the scheduler in background
-    scheduler.schedule_daily_update()
-    scheduler.start_background_scheduler()
-    
-    # Run the Flask app
+    # Updates are run by worker.py in its own process
     app.run(debug=config.FLASK_DEBUG, host='0.0.0.0', port=8080) 
\ No newline at end of file
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Load test of GET / while articles are being ingested
+Seeds a fresh database, serves the app with the threaded development server, and has
+several clients request the index page while a second process commits one article
+every few milliseconds; reports p50/p99 latency of the page and the rows the writer stored
+--repo points at another checkout of the project (for example an older revision) to
+compare against it with the same settings
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+SERVER = '''
+import sys
+sys.path.insert(0, {repo!r})
+import config
+if {no_cache!r}:
+    config.CACHE_TTL = 0
+import app
+app.app.run(port={port}, threaded=True)
+'''
+
+WRITER = '''
+import sys, time
+sys.path.insert(0, {repo!r})
+from database import NewsDatabase
+db = NewsDatabase('newsfeed.db')
+inserted = errors = 0
+end = time.time() + {duration}
+while time.time() < end:
+    ok = db.add_article({{'title': 'Ingested article', 'url': f'http://ingest/{{inserted + errors}}',
+                         'source': 'Load test', 'published_date': '2026-01-02'}})
+    inserted += bool(ok)
+    errors += not ok
+    time.sleep({interval})
+print(inserted, errors)
+'''
+
+def seed(repo: str, count: int):
+    """Fill newsfeed.db in the current directory with count relevant articles"""
+    sys.path.insert(0, repo)
+    from database import NewsDatabase
+    db = NewsDatabase('newsfeed.db')
+    articles = [{
+        'title': f'Virtual fencing trial {i}', 'description': 'pasture ' * 20, 'content': 'x' * 2000,
+        'url': f'http://seed/{i}', 'source': 'Load test', 'category': 'farming',
+        'published_date': f'2026-01-{1 + i % 28:02d}T10:00:00', 'relevance_score': 0.9,
+        'keywords_matched': ['virtual fencing'],
+    } for i in range(count)]
+    if hasattr(db, 'add_articles'):
+        db.add_articles(articles)
+    else:
+        for article in articles:
+            db.add_article(article)
+
+def wait_for_server(url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=5).read()
+            return
+        except Exception:
+            time.sleep(0.2)
+    sys.exit(f"Server did not answer at {url}")
+
+def percentile(values, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure index page latency during an ingest')
+    parser.add_argument('--repo', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help='checkout of the project to test')
+    parser.add_argument('--articles', type=int, default=5000, help='articles seeded before the test')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent clients requesting /')
+    parser.add_argument('--duration', type=float, default=15, help='seconds the clients run for')
+    parser.add_argument('--interval', type=float, default=0.005, help='seconds between ingested rows')
+    parser.add_argument('--no-ingest', action='store_true', help='measure without the writer')
+    parser.add_argument('--cache', action='store_true', help='keep the response cache on')
+    parser.add_argument('--port', type=int, default=8799)
+    args = parser.parse_args()
+    
+    repo = os.path.abspath(args.repo)
+    workdir = tempfile.mkdtemp(prefix='pasture-load-')
+    os.chdir(workdir)
+    seed(repo, args.articles)
+    
+    url = f'http://127.0.0.1:{args.port}/?relevance=0.2&days=36500'
+    server = subprocess.Popen([sys.executable, '-c', SERVER.format(repo=repo, no_cache=not args.cache,
+                                                                   port=args.port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    writer = None
+    try:
+        wait_for_server(url)
+        if not args.no_ingest:
+            # The writer outlives the clients so every request overlaps the ingest
+            writer = subprocess.Popen([sys.executable, '-c', WRITER.format(repo=repo, duration=args.duration + 2,
+                                                                           interval=args.interval)],
+                                      stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+        
+        def client():
+            end = time.time() + args.duration
+            while time.time() < end:
+                started = time.perf_counter()
+                try:
+                    urllib.request.urlopen(url, timeout=30).read()
+                except Exception:
+                    with lock:
+                        errors[0] += 1
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+        
+        threads = [threading.Thread(target=client) for _ in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        # add_article prints its errors, so the counts are the last line
+        writer_result = writer.communicate()[0].decode().splitlines()[-1].split() if writer else None
+    finally:
+        server.terminate()
+        if writer and writer.poll() is None:
+            writer.terminate()
+    
+    latencies.sort()
+    print(f"{len(latencies)} requests, {errors[0]} errors, "
+          f"p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p99 {percentile(latencies, 0.99) * 1000:.0f} ms")
+    if writer_result:
+        print(f"writer stored {writer_result[0]} rows, {writer_result[1]} failed")
+    print(f"database left in {workdir}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of ContentFilter.calculate_relevance_score against the per-keyword
+regex scorer it replaced
+Both scorers run on the same synthetic articles; the script checks that scores and
+matched keywords agree for every article before reporting articles/sec for each
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from content_filter import ContentFilter
+
+FILLER = ('the a of and new report says prices market week farmers-led GPS fencing '
+          'farm-technology Farming, farm. FARM technology virtual fence').split()
+
+def baseline_relevance_score(keywords: Dict[str, List[str]], weights: Dict[str, float],
+                             title: str, description: str, content: str = "") -> Tuple[float, List[str]]:
+    """The previous scorer: one regex compiled and run per keyword over each field"""
+    text = f"{title} {description} {content}".lower()
+    matched_keywords = []
+    total_score = 0.0
+    
+    for category, category_keywords in keywords.items():
+        category_score = 0.0
+        category_matches = []
+        
+        for keyword in category_keywords:
+            pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
+            matches = len(re.findall(pattern, text))
+            
+            if matches > 0:
+                category_matches.append(keyword)
+                title_matches = len(re.findall(pattern, title.lower()))
+                desc_matches = len(re.findall(pattern, description.lower()))
+                category_score += (title_matches * 3 + desc_matches * 2 + matches) * 0.1
+        
+        if category_score > 0:
+            total_score += category_score * weights.get(category, 1.0)
+            matched_keywords.extend(category_matches)
+    
+    return min(total_score, 1.0), matched_keywords
+
+def synthetic_articles(count: int, density: float, seed: int) -> List[Tuple[str, str, str]]:
+    """(title, description, content) of 12, 40 and 300 words, density of them keywords"""
+    rng = random.Random(seed)
+    keywords = [keyword for category_keywords in config.KEYWORDS.values() for keyword in category_keywords]
+    
+    def words(n: int) -> str:
+        return ' '.join(rng.choice(keywords if rng.random() < density else FILLER) for _ in range(n))
+    
+    articles = [(words(12), words(40), words(300)) for _ in range(count)]
+    # Overlapping and run-together keywords, punctuation and non-ASCII neighbours
+    articles.append(('farm technology farm farm', 'virtual fencevirtual fence',
+                     'pig pig-farm sheepé cattle_control cattle control'))
+    return articles
+
+def articles_per_second(score, articles: List[Tuple[str, str, str]]) -> float:
+    started = time.perf_counter()
+    for article in articles:
+        score(*article)
+    return len(articles) / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the keyword relevance scorer')
+    parser.add_argument('--articles', type=int, default=2000, help='synthetic articles to score')
+    parser.add_argument('--density', type=float, default=0.15, help='share of words that are keywords')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    
+    content_filter = ContentFilter()
+    articles = synthetic_articles(args.articles, args.density, args.seed)
+    
+    def baseline(title, description, content):
+        return baseline_relevance_score(content_filter.keywords, content_filter.CATEGORY_WEIGHTS,
+                                        title, description, content)
+    
+    for article in articles:
+        expected = baseline(*article)
+        actual = content_filter.calculate_relevance_score(*article)
+        if actual != expected:
+            sys.exit(f"Scores differ for {article!r}: {actual} != {expected}")
+    print(f"Scores and matched keywords identical on {len(articles)} articles")
+    
+    print(f"before: {articles_per_second(baseline, articles):,.0f} articles/sec")
+    print(f"after:  {articles_per_second(content_filter.calculate_relevance_score, articles):,.0f} articles/sec")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import config
+
+class ResponseCache:
+    """
+    Bounded LRU cache with per-entry TTL for rendered responses
+    Entries are dropped whenever the data generation reported by generation_source changes
+    """
+    
+    def __init__(self, generation_source: Callable[[], int],
+                 max_entries: int = config.CACHE_MAX_ENTRIES,
+                 ttl: float = config.CACHE_TTL,
+                 check_interval: float = config.CACHE_GENERATION_CHECK_INTERVAL):
+        self.generation_source = generation_source
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def _check_generation(self):
+        """Clear the cache if the data changed since it was filled"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        
+        generation = self.generation_source()
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._generation = generation
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            self._check_generation()
+            
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key: Hashable, value: Any):
+        """Store value under key, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def stats(self) -> Dict:
+        """Get hit/miss counters for sizing the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'generation': self._generation,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
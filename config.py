@@ -139,16 +139,71 @@ KEYWORDS = {
 
 # Database configuration
 DATABASE_PATH = 'newsfeed.db'
+DB_POOL_SIZE = 8  # Idle connections kept open per database file
+DB_BUSY_TIMEOUT = 30  # Seconds to wait for a write lock
+
+# Response cache settings
+CACHE_MAX_ENTRIES = 256
+CACHE_TTL = 300  # Seconds a cached page or API response stays fresh
+CACHE_GENERATION_CHECK_INTERVAL = 1.0  # Seconds between checks for new data
+
+# Change feed settings
+CHANGES_POLL_INTERVAL = 1.0  # Seconds between checks of the change watermark
+CHANGES_MAX_WAIT = 60  # Longest long-poll a client may request, in seconds
+SSE_KEEPALIVE = 15  # Seconds between keepalive comments on idle event streams
+
+# Outbound HTTP settings
+HTTP_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+HTTP_CONNECT_TIMEOUT = 5  # Seconds to establish a connection
+HTTP_READ_TIMEOUT = 20  # Seconds to wait for response data
+HTTP_RETRIES = 3  # Retries for connection errors and 429/5xx responses; a Retry-After response skips the host instead
+HTTP_BACKOFF = 0.5  # Backoff factor between retries, in seconds
+HTTP_POOL_HOSTS = 32  # Hosts with a keep-alive pool kept open
+
+# Raw page cache settings
+PAGE_CACHE_PATH = 'page_cache.db'
+PAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Compressed pages kept before the least recently used are evicted
+PAGE_CACHE_TTL = 7 * 24 * 3600  # Seconds a cached page is used without asking the server again
 
 # Scheduler configuration
-SCHEDULE_TIME = '07:00'  # 7am CET
 TIMEZONE = pytz.timezone('Europe/Paris')
 
+# Per-source polling settings
+POLL_MIN_INTERVAL = 15 * 60  # Fastest a feed is polled, in seconds
+POLL_MAX_INTERVAL = 24 * 3600  # Slowest a quiet feed is polled, in seconds
+POLL_INITIAL_INTERVAL = 3600  # Interval after a feed's first poll, before its publish rate is known
+POLL_TARGET_ARTICLES = 2  # A feed is polled about as often as it publishes this many new entries
+POLL_RATE_WINDOW = 24 * 3600  # Seconds of history the publish rate estimate mostly reflects
+POLL_JITTER = 0.2  # Random share added to or taken off each interval so feeds drift apart
+POLL_CHECK_INTERVAL = 60  # Seconds between worker checks for due feeds
+
+# Update worker settings
+JOB_POLL_INTERVAL = 2  # Seconds the worker waits between checks of an empty queue
+JOB_HEARTBEAT_INTERVAL = 15  # Seconds between heartbeats of a running job
+JOB_STALE_AFTER = 300  # Seconds without a heartbeat before a running job is requeued
+JOB_MAX_ATTEMPTS = 3  # Runs of a job before it is failed instead of requeued
+JOB_MAX_BACKOFF = 60  # Most seconds the worker waits before retrying after a database error
+
 # Flask configuration
 FLASK_SECRET_KEY = os.environ.get('FLASK_SECRET_KEY', 'your-secret-key-here')
 FLASK_DEBUG = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
 
+# Profiling settings, all off unless PROFILE_REQUESTS is set
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS', 'False').lower() == 'true'  # Time queries, templates and requests
+SLOW_QUERY_THRESHOLD = float(os.environ.get('SLOW_QUERY_THRESHOLD', 0.1))  # Seconds before a query goes to the slow query log
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG', 'slow_queries.log')
+PROFILE_SAMPLE_PERCENT = float(os.environ.get('PROFILE_SAMPLE_PERCENT', 0))  # Share of requests run under cProfile
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')  # Where sampled cProfile stats are written
+
 # Content filtering settings
 MIN_RELEVANCE_SCORE = 0.2
+SCORING_ENGINE = os.environ.get('SCORING_ENGINE', 'keyword')  # 'keyword', or 'tfidf' to rank with TF-IDF (needs numpy and scipy)
 MAX_ARTICLES_PER_UPDATE = 100
-DAYS_TO_KEEP_ARTICLES = 60 
\ No newline at end of file
+NEAR_DUPLICATE_SIMILARITY = 0.7  # Estimated shingle overlap (Jaccard) for two articles to count as the same story
+DAYS_TO_KEEP_ARTICLES = 60
+
+# Scraper concurrency settings
+MAX_FETCH_WORKERS = int(os.environ.get('MAX_FETCH_WORKERS', 8))
+PER_HOST_DELAY = 1.0  # Minimum seconds between requests to the same host
+EXTRACT_WORKERS = int(os.environ.get('EXTRACT_WORKERS', os.cpu_count() or 1))  # Processes parsing downloaded pages
+EXTRACT_QUEUE_SIZE = 32  # Downloaded pages waiting for a parser before downloads block 
\ No newline at end of file
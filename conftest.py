@@ -0,0 +1 @@
+"""Lets pytest import the application modules from the repository root"""
@@ -1,12 +1,91 @@
 import re
-from typing import List, Dict, Tuple
+import json
+import hashlib
+from typing import List, Dict, Tuple, Optional, Iterable
 from collections import Counter
+from concurrent.futures import Executor
 import config
+from scoring_engines import create_scoring_engine
+
+# ContentFilter built lazily in each process pool worker
+_worker_filter = None
+
+def _score_chunk(chunk: List[Tuple[str, str, str]]) -> List[Dict]:
+    """Score a chunk of (title, description, content) tuples in a worker process"""
+    global _worker_filter
+    if _worker_filter is None:
+        _worker_filter = ContentFilter()
+    return [_worker_filter.score_text(*fields) for fields in chunk]
+
+def _short_hash(value) -> str:
+    payload = json.dumps(value, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
 
 class ContentFilter:
+    # Weight different keyword categories
+    CATEGORY_WEIGHTS = {
+        'virtual_fencing': 1.5,  # Higher weight for virtual fencing
+        'herd_control': 1.3,     # High weight for herd control
+        'pasture_management': 1.3, # High weight for pasture management
+        'agritech': 1.0,         # Standard weight for general agritech
+        'general_farming': 0.8    # Lower weight but still relevant
+    }
+    
     def __init__(self):
         self.keywords = config.KEYWORDS
         self.min_relevance_score = config.MIN_RELEVANCE_SCORE
+        self.engine = create_scoring_engine(config.SCORING_ENGINE, self.keywords, self.CATEGORY_WEIGHTS)
+        self.model_version = None
+        self.keywords_version = self._keywords_version()
+        self._compile_keyword_matcher()
+    
+    def _keywords_version(self, model: bool = True) -> str:
+        """
+        Short hash of the keywords, category weights and engine, stored with every score
+        With an engine it also covers the fitted model, so rank scores from another fit count as stale
+        """
+        ranking = {'keywords': self.keywords, 'weights': self.CATEGORY_WEIGHTS,
+                   'engine': self.engine.name if self.engine else 'keyword'}
+        if self.engine:
+            # Engine scores used to overwrite relevance_score; rows scored that way are re-scored
+            ranking['rank_column'] = 'rank_score'
+            if model:
+                ranking['model'] = self.model_version
+        return _short_hash(ranking)
+    
+    def _compile_keyword_matcher(self):
+        """Precompile a single pattern that finds every keyword in one pass over the text"""
+        self._category_keywords = [
+            (category, [(keyword, keyword.lower()) for keyword in keywords])
+            for category, keywords in self.keywords.items()
+        ]
+        lowered = {keyword.lower() for keywords in self.keywords.values() for keyword in keywords}
+        
+        # Zero-width lookahead so every word boundary is tried, longest keyword first
+        alternation = '|'.join(re.escape(keyword) for keyword in sorted(lowered, key=len, reverse=True)) or '(?!)'
+        self._keyword_pattern = re.compile(r'\b(?=(' + alternation + r')\b)')
+        
+        # Shorter keywords that also match wherever a longer one does ('farm' in 'farm technology')
+        self._implied_keywords = {
+            longer: [keyword for keyword in lowered
+                     if re.match(r'\b' + re.escape(keyword) + r'\b', longer)]
+            for longer in lowered
+        }
+    
+    def _count_keywords(self, text: str) -> Dict[str, int]:
+        """Count non-overlapping whole-word matches of every keyword in lowercased text"""
+        counts = {}
+        last_end = {}
+        
+        for match in self._keyword_pattern.finditer(text):
+            start = match.start()
+            for keyword in self._implied_keywords[match.group(1)]:
+                # Same semantics as re.findall for each keyword on its own
+                if start >= last_end.get(keyword, 0):
+                    counts[keyword] = counts.get(keyword, 0) + 1
+                    last_end[keyword] = start + len(keyword)
+        
+        return counts
     
     def calculate_relevance_score(self, title: str, description: str, content: str = "") -> Tuple[float, List[str]]:
         """
@@ -17,36 +96,33 @@ class ContentFilter:
         matched_keywords = []
         total_score = 0.0
         
-        # Weight different keyword categories
-        category_weights = {
-            'virtual_fencing': 1.5,  # Higher weight for virtual fencing
-            'herd_control': 1.3,     # High weight for herd control
-            'pasture_management': 1.3, # High weight for pasture management
-            'agritech': 1.0,         # Standard weight for general agritech
-            'general_farming': 0.8    # Lower weight but still relevant
-        }
+        text_counts = self._count_keywords(text)
+        if not text_counts:
+            return 0.0, matched_keywords
         
-        for category, keywords in self.keywords.items():
+        # Title and description are only scanned when the article matched at all
+        title_counts = self._count_keywords(title.lower())
+        desc_counts = self._count_keywords(description.lower())
+        
+        for category, keywords in self._category_keywords:
             category_score = 0.0
             category_matches = []
             
-            for keyword in keywords:
-                # Count keyword occurrences
-                pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-                matches = len(re.findall(pattern, text))
+            for keyword, lowered in keywords:
+                matches = text_counts.get(lowered, 0)
                 
                 if matches > 0:
                     category_matches.append(keyword)
                     # Weight by frequency and position (title gets higher weight)
-                    title_matches = len(re.findall(pattern, title.lower()))
-                    desc_matches = len(re.findall(pattern, description.lower()))
+                    title_matches = title_counts.get(lowered, 0)
+                    desc_matches = desc_counts.get(lowered, 0)
                     
                     # Title matches are worth more
                     category_score += (title_matches * 3 + desc_matches * 2 + matches) * 0.1
             
             if category_score > 0:
                 # Apply category weight
-                weighted_score = category_score * category_weights.get(category, 1.0)
+                weighted_score = category_score * self.CATEGORY_WEIGHTS.get(category, 1.0)
                 total_score += weighted_score
                 matched_keywords.extend(category_matches)
         
@@ -60,23 +136,91 @@ class ContentFilter:
         score, _ = self.calculate_relevance_score(title, description, content)
         return score >= self.min_relevance_score
     
-    def filter_articles(self, articles: List[Dict]) -> List[Dict]:
+    def score_text(self, title: str, description: str, content: str = "") -> Dict:
+        """Compute score, matched keywords and category for one article's text"""
+        score, matched_keywords = self.calculate_relevance_score(title, description, content)
+        return {
+            'relevance_score': score,
+            'keywords_matched': matched_keywords,
+            'category': self.categorize_article(title, description)
+        }
+    
+    def fit(self, articles: Iterable[Dict]):
+        """Train the scoring engine, if any, on the stored archive"""
+        if self.engine:
+            self.engine.fit(
+                self.engine.article_text(article.get('title') or '', article.get('description') or '',
+                                         article.get('content') or '')
+                for article in articles
+            )
+            self.model_version = _short_hash(self.engine.model())
+            self.keywords_version = self._keywords_version()
+    
+    def model(self) -> Optional[Dict]:
+        """The fitted engine model to store, see load_model"""
+        if not self.engine:
+            return None
+        return {'version': self.model_version, 'seeds': self._keywords_version(model=False),
+                **self.engine.model()}
+    
+    def load_model(self, model: Dict) -> bool:
+        """
+        Use a stored engine model instead of fitting one
+        Returns False when it was fitted for other keywords, weights or engine
+        """
+        if not self.engine or model.get('seeds') != self._keywords_version(model=False):
+            return False
+        self.engine.load_model(model)
+        self.model_version = model['version']
+        self.keywords_version = self._keywords_version()
+        return True
+    
+    def score_articles(self, articles: List[Dict], executor: Optional[Executor] = None,
+                       chunk_size: int = 200, rank: bool = True) -> List[Dict]:
+        """
+        Score each article once, in order
+        Pass a ProcessPoolExecutor to spread large batches over all cores
+        relevance_score is the keyword relevance; rank_score orders listings and is the
+        engine's score when there is a scoring engine and rank is set
+        """
+        fields = [
+            (article.get('title', ''), article.get('description', ''), article.get('content', ''))
+            for article in articles
+        ]
+        
+        if executor is None or len(fields) <= chunk_size:
+            results = [self.score_text(*item) for item in fields]
+        else:
+            chunks = [fields[i:i + chunk_size] for i in range(0, len(fields), chunk_size)]
+            results = []
+            for chunk_results in executor.map(_score_chunk, chunks):
+                results.extend(chunk_results)
+        
+        for result in results:
+            result['rank_score'] = result['relevance_score']
+        
+        if self.engine and rank:
+            texts = [self.engine.article_text(title or '', description or '', content or '')
+                     for title, description, content in fields]
+            for result, score in zip(results, self.engine.score(texts)):
+                result['rank_score'] = score
+        
+        return results
+    
+    def filter_articles(self, articles: List[Dict], executor: Optional[Executor] = None) -> List[Dict]:
         """Filter articles based on relevance"""
         filtered_articles = []
         
-        for article in articles:
-            title = article.get('title', '')
-            description = article.get('description', '')
-            content = article.get('content', '')
-            
-            if self.is_relevant(title, description, content):
-                score, matched_keywords = self.calculate_relevance_score(title, description, content)
-                article['relevance_score'] = score
-                article['keywords_matched'] = matched_keywords
+        for article, result in zip(articles, self.score_articles(articles, executor)):
+            if result['relevance_score'] >= self.min_relevance_score:
+                article['relevance_score'] = result['relevance_score']
+                article['rank_score'] = result['rank_score']
+                article['keywords_matched'] = result['keywords_matched']
+                article['keywords_version'] = self.keywords_version
                 filtered_articles.append(article)
         
-        # Sort by relevance score (highest first)
-        filtered_articles.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
+        # Sort by rank (highest first)
+        filtered_articles.sort(key=lambda x: x.get('rank_score', 0), reverse=True)
         
         return filtered_articles
     
@@ -1,84 +1,117 @@
 import sqlite3
 import json
+import base64
+import re
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Iterable, Iterator, Tuple
 import config
+from migrations import apply_migrations
+from metrics import SOURCE_FIELDS
+from profiling import connection_factory
+
+class ConnectionPool:
+    """Pool of long-lived SQLite connections shared between threads"""
+    
+    PRAGMAS = (
+        'PRAGMA journal_mode=WAL',        # Readers are not blocked by the writer
+        'PRAGMA synchronous=NORMAL',      # Safe with WAL, fsync only at checkpoints
+        'PRAGMA cache_size=-16000',       # 16 MB page cache per connection
+        'PRAGMA mmap_size=268435456',     # Memory-map up to 256 MB of the file
+        'PRAGMA temp_store=MEMORY',
+    )
+    
+    _pools = {}
+    _pools_lock = threading.Lock()
+    
+    def __init__(self, db_path: str, max_idle: int = config.DB_POOL_SIZE):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+    
+    @classmethod
+    def for_path(cls, db_path: str) -> 'ConnectionPool':
+        """Get the pool shared by every NewsDatabase using db_path"""
+        with cls._pools_lock:
+            if db_path not in cls._pools:
+                cls._pools[db_path] = cls(db_path)
+            return cls._pools[db_path]
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection with the tuned pragmas applied"""
+        conn = sqlite3.connect(self.db_path, timeout=config.DB_BUSY_TIMEOUT,
+                               check_same_thread=False, cached_statements=256,
+                               factory=connection_factory())
+        conn.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        
+        try:
+            with conn:
+                yield conn
+        finally:
+            if self._idle.qsize() < self.max_idle:
+                self._idle.put(conn)
+            else:
+                conn.close()
 
 class NewsDatabase:
     def __init__(self, db_path: str = config.DATABASE_PATH):
         self.db_path = db_path
+        self.pool = ConnectionPool.for_path(db_path)
         self.init_database()
     
+    def _connection(self):
+        """Borrow a pooled connection for the duration of a with block"""
+        return self.pool.connection()
+    
     def init_database(self):
-        """Initialize the database with required tables"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Create articles table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS articles (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    content TEXT,
-                    url TEXT UNIQUE NOT NULL,
-                    source TEXT NOT NULL,
-                    category TEXT,
-                    published_date TEXT,
-                    relevance_score REAL DEFAULT 0.0,
-                    keywords_matched TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create sources table to track RSS sources
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sources (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    url TEXT UNIQUE NOT NULL,
-                    category TEXT,
-                    last_fetch TIMESTAMP,
-                    status TEXT DEFAULT 'active'
-                )
-            ''')
-            
-            # Create fetch_log table to track update history
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS fetch_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    source_name TEXT,
-                    articles_found INTEGER,
-                    articles_added INTEGER,
-                    fetch_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    status TEXT
-                )
-            ''')
-            
-            conn.commit()
+        """Initialize the database by applying any pending schema migrations"""
+        with self._connection() as conn:
+            apply_migrations(conn)
+    
+    INSERT_ARTICLE_SQL = '''
+        INSERT OR IGNORE INTO articles 
+        (title, description, content, url, source, category, 
+         published_date, relevance_score, rank_score, keywords_matched, keywords_version)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    
+    @staticmethod
+    def _article_row(article_data: Dict) -> tuple:
+        """Build the insert parameters for an article"""
+        return (
+            article_data.get('title', ''),
+            article_data.get('description', ''),
+            article_data.get('content', ''),
+            article_data.get('url', ''),
+            article_data.get('source', ''),
+            article_data.get('category', ''),
+            article_data.get('published_date', ''),
+            article_data.get('relevance_score', 0.0),
+            article_data.get('rank_score', article_data.get('relevance_score', 0.0)),
+            json.dumps(article_data.get('keywords_matched', [])),
+            article_data.get('keywords_version')
+        )
     
     def add_article(self, article_data: Dict) -> bool:
         """Add a new article to the database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    INSERT OR IGNORE INTO articles 
-                    (title, description, content, url, source, category, 
-                     published_date, relevance_score, keywords_matched)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    article_data.get('title', ''),
-                    article_data.get('description', ''),
-                    article_data.get('content', ''),
-                    article_data.get('url', ''),
-                    article_data.get('source', ''),
-                    article_data.get('category', ''),
-                    article_data.get('published_date', ''),
-                    article_data.get('relevance_score', 0.0),
-                    json.dumps(article_data.get('keywords_matched', []))
-                ))
+                cursor.execute(self.INSERT_ARTICLE_SQL, self._article_row(article_data))
                 
                 conn.commit()
                 return cursor.rowcount > 0
@@ -86,24 +119,160 @@ class NewsDatabase:
             print(f"Error adding article: {e}")
             return False
     
-    def get_articles_count(self, category: Optional[str] = None, days_back: int = 7) -> int:
-        """Get total count of articles for pagination"""
+    def add_articles(self, articles: Iterable[Dict], chunk_size: int = 500) -> Dict[str, int]:
+        """
+        Add many articles over one connection, committing once per chunk
+        Returns: {'inserted': n, 'ignored': n, 'inserted_urls': [url]} where ignored rows were already stored
+        Raises sqlite3.Error if a chunk cannot be stored; the chunks before it stay committed
+        """
+        counts = {'inserted': 0, 'ignored': 0, 'inserted_urls': []}
+        
+        # Errors reach the caller, which must not treat the feeds as handled
+        with self._connection() as conn:
+            chunk = []
+            for article in articles:
+                chunk.append(article)
+                if len(chunk) >= chunk_size:
+                    self._insert_chunk(conn, chunk, counts)
+                    chunk = []
+            
+            if chunk:
+                self._insert_chunk(conn, chunk, counts)
+        
+        return counts
+    
+    def _insert_chunk(self, conn: sqlite3.Connection, chunk: List[Dict], counts: Dict):
+        """Insert one chunk of articles and commit it"""
+        cursor = conn.cursor()
+        inserted = []
+        # One statement per row, since executemany only reports the total inserted
+        for article in chunk:
+            cursor.execute(self.INSERT_ARTICLE_SQL, self._article_row(article))
+            if cursor.rowcount > 0:
+                inserted.append(article.get('url', ''))
+        conn.commit()
+        
+        counts['inserted'] += len(inserted)
+        counts['ignored'] += len(chunk) - len(inserted)
+        counts['inserted_urls'].extend(inserted)
+    
+    def get_existing_urls(self, urls: List[str], chunk_size: int = 500) -> Set[str]:
+        """Return the subset of urls that are already stored, as articles or as known duplicates"""
+        existing = set()
+        urls = list(set(urls))
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
-                query = '''
-                    SELECT COUNT(*) FROM articles 
-                    WHERE created_at >= datetime('now', '-{} days')
-                '''.format(days_back)
+                # Chunk the lookup to stay under SQLite's bound parameter limit
+                for i in range(0, len(urls), chunk_size):
+                    chunk = urls[i:i + chunk_size]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f'''
+                        SELECT url FROM articles WHERE url IN ({placeholders})
+                        UNION ALL
+                        SELECT url FROM duplicate_articles WHERE url IN ({placeholders})
+                    ''', chunk + chunk)
+                    existing.update(row[0] for row in cursor.fetchall())
+        except Exception as e:
+            print(f"Error checking existing urls: {e}")
+        
+        return existing
+    
+    def find_signature_candidates(self, kind: str,
+                                  buckets: Dict[Tuple, List[Tuple[int, int]]]) -> Dict[Tuple, List[Tuple[str, bytes]]]:
+        """
+        Look up stored articles sharing an LSH band bucket with each query signature
+        buckets maps each signature to its (band, bucket) pairs
+        Returns: {signature: [(url, stored_signature)]}
+        """
+        candidates = {}
+        
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
                 
-                params = []
+                for signature, pairs in buckets.items():
+                    # Driving the join from the wanted buckets makes each one a primary key seek
+                    placeholders = ','.join('(?, ?)' for _ in pairs)
+                    cursor.execute(f'''
+                        WITH wanted (band, bucket) AS (VALUES {placeholders})
+                        SELECT DISTINCT articles.url, article_signatures.signature
+                        FROM wanted
+                        JOIN signature_bands ON signature_bands.kind = ?
+                             AND signature_bands.band = wanted.band
+                             AND signature_bands.bucket = wanted.bucket
+                        JOIN article_signatures ON article_signatures.article_id = signature_bands.article_id
+                             AND article_signatures.kind = signature_bands.kind
+                        JOIN articles ON articles.id = signature_bands.article_id
+                    ''', [value for pair in pairs for value in pair] + [kind])
+                    candidates[signature] = [(row[0], row[1]) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error finding signature candidates: {e}")
+        
+        return candidates
+    
+    def get_unsigned_articles(self, after_id: int = 0, limit: int = 500) -> List[Dict]:
+        """Get the next batch of articles with id above after_id that have no content signature, in id order"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, url, title, description, content FROM articles
+                WHERE id > ? AND NOT EXISTS (
+                    SELECT 1 FROM article_signatures
+                    WHERE article_id = articles.id AND kind = 'content'
+                )
+                ORDER BY id
+                LIMIT ?
+            ''', (after_id, limit))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def add_signatures(self, signatures: List[Tuple[str, str, bytes, List[Tuple[int, int]]]]):
+        """Store (url, kind, packed signature, band buckets) for articles that are already inserted"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
                 
-                if category:
-                    query += ' AND category = ?'
-                    params.append(category)
+                for url, kind, signature, pairs in signatures:
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO article_signatures (article_id, kind, signature)
+                        SELECT id, ?, ? FROM articles WHERE url = ?
+                    ''', (kind, signature, url))
+                    if cursor.rowcount:
+                        cursor.executemany('''
+                            INSERT OR IGNORE INTO signature_bands (kind, band, bucket, article_id)
+                            SELECT ?, ?, ?, id FROM articles WHERE url = ?
+                        ''', [(kind, band, bucket, url) for band, bucket in pairs])
+        except Exception as e:
+            print(f"Error adding signatures: {e}")
+    
+    def add_duplicates(self, duplicates: List[Dict]) -> int:
+        """Record near-duplicate articles under their canonical article, if it is stored"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO duplicate_articles (url, canonical_url, title, source, kind, similarity)
+                    SELECT ?, url, ?, ?, ?, ? FROM articles WHERE url = ?
+                ''', [(article['url'], article.get('title', ''), article.get('source', ''),
+                       article.get('duplicate_kind'), article.get('duplicate_similarity'), article['canonical_url'])
+                      for article in duplicates])
+                return cursor.rowcount
+        except Exception as e:
+            print(f"Error adding duplicates: {e}")
+            return 0
+    
+    def get_articles_count(self, category: Optional[str] = None, days_back: int = 7,
+                           min_relevance: float = 0.0) -> int:
+        """Get total count of articles for pagination"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
                 
-                cursor.execute(query, params)
+                where, params = self._article_filters(category, days_back, min_relevance,
+                                                      use_created_index=True)
+                cursor.execute(f'SELECT COUNT(*) FROM articles {where}', params)
                 count = cursor.fetchone()[0]
                 
                 return count
@@ -111,54 +280,196 @@ class NewsDatabase:
             print(f"Error getting articles count: {e}")
             return 0
     
+    @staticmethod
+    def _row_to_article(row: sqlite3.Row) -> Dict:
+        """Convert a database row to an article dict"""
+        article = dict(row)
+        # Parse keywords_matched from JSON
+        if article['keywords_matched']:
+            article['keywords_matched'] = json.loads(article['keywords_matched'])
+        else:
+            article['keywords_matched'] = []
+        return article
+    
+    @staticmethod
+    def _article_filters(category: Optional[str], days_back: int, min_relevance: float,
+                         use_created_index: bool = False) -> Tuple[str, List]:
+        """Build the WHERE clause shared by the article listing and count queries"""
+        # Listings write +created_at to keep the planner on the sort-order indexes
+        # rather than idx_articles_created, so no temporary sort is needed; counts
+        # want the created_at indexes
+        created_at = 'created_at' if use_created_index else '+created_at'
+        where = f"WHERE {created_at} >= datetime('now', ?)"
+        params = [f'-{days_back} days']
+        
+        if category:
+            where += ' AND category = ?'
+            params.append(category)
+        if min_relevance > 0.0:
+            where += ' AND relevance_score >= ?'
+            params.append(min_relevance)
+        
+        return where, params
+    
+    @staticmethod
+    def encode_cursor(article: Dict) -> str:
+        """Build an opaque pagination cursor from an article's sort key"""
+        key = [article['published_date'], article['rank_score'], article['id']]
+        return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> List:
+        """Decode a pagination cursor, raising ValueError if it is malformed"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except Exception:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        if not isinstance(key, list) or len(key) != 3:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return key
+    
     def get_articles(self, limit: int = 50, category: Optional[str] = None, 
                     days_back: int = 7, offset: int = 0, min_relevance: float = 0.0) -> List[Dict]:
         """Retrieve articles from the database with pagination support and sorting by published_date DESC"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
-                query = '''
-                    SELECT * FROM articles 
-                    WHERE created_at >= datetime('now', '-{} days')
-                '''.format(days_back)
-                
-                params = []
-                
-                if category:
-                    query += ' AND category = ?'
-                    params.append(category)
-                if min_relevance > 0.0:
-                    query += ' AND relevance_score >= ?'
-                    params.append(min_relevance)
-                
-                query += ' ORDER BY published_date DESC, relevance_score DESC, created_at DESC LIMIT ? OFFSET ?'
+                where, params = self._article_filters(category, days_back, min_relevance)
+                query = f'''
+                    SELECT * FROM articles {where}
+                    ORDER BY published_date DESC, rank_score DESC, id DESC
+                    LIMIT ? OFFSET ?
+                '''
                 params.extend([limit, offset])
                 
                 cursor.execute(query, params)
-                rows = cursor.fetchall()
                 
-                articles = []
-                for row in rows:
-                    article = dict(row)
-                    # Parse keywords_matched from JSON
-                    if article['keywords_matched']:
-                        article['keywords_matched'] = json.loads(article['keywords_matched'])
-                    else:
-                        article['keywords_matched'] = []
-                    articles.append(article)
-                
-                return articles
+                return [self._row_to_article(row) for row in cursor.fetchall()]
         except Exception as e:
             print(f"Error retrieving articles: {e}")
             return []
     
+    def get_articles_page(self, limit: int = 12, category: Optional[str] = None,
+                          days_back: int = 7, min_relevance: float = 0.0,
+                          cursor: Optional[str] = None, direction: str = 'next',
+                          include_total: bool = False) -> Dict:
+        """
+        Retrieve one page of articles using keyset pagination on (published_date, rank_score, id)
+        cursor comes from a previous page's next_cursor or prev_cursor; direction is 'next' or 'prev'
+        include_total adds 'total', the number of articles matching the filters, from the same statement
+        Returns: {'articles': [...], 'next_cursor': str or None, 'prev_cursor': str or None}
+        Raises ValueError for a malformed cursor
+        """
+        key = self.decode_cursor(cursor) if cursor else None
+        backwards = key is not None and direction == 'prev'
+        
+        where, params = self._article_filters(category, days_back, min_relevance)
+        if key is not None:
+            where += f" AND (published_date, rank_score, id) {'>' if backwards else '<'} (?, ?, ?)"
+            params.extend(key)
+        
+        # An uncorrelated subquery runs once per statement and can use the covering
+        # created_at indexes, unlike COUNT(*) OVER () which materializes every match
+        columns = '*'
+        if include_total:
+            count_where, count_params = self._article_filters(category, days_back, min_relevance,
+                                                              use_created_index=True)
+            columns = f'*, (SELECT COUNT(*) FROM articles {count_where}) AS total_count'
+            params = count_params + params
+        
+        # Walk the index backwards for the previous page, then restore display order
+        order = 'ASC' if backwards else 'DESC'
+        query = f'''
+            SELECT {columns} FROM articles {where}
+            ORDER BY published_date {order}, rank_score {order}, id {order}
+            LIMIT ?
+        '''
+        params.append(limit + 1)
+        
+        try:
+            with self._connection() as conn:
+                db_cursor = conn.cursor()
+                db_cursor.execute(query, params)
+                rows = db_cursor.fetchall()
+        except Exception as e:
+            print(f"Error retrieving articles page: {e}")
+            page = {'articles': [], 'next_cursor': None, 'prev_cursor': None}
+            if include_total:
+                page['total'] = 0
+            return page
+        
+        has_more = len(rows) > limit
+        if backwards and not has_more:
+            # Reached the start, so serve the real first page rather than a short one
+            return self.get_articles_page(limit, category, days_back, min_relevance,
+                                          include_total=include_total)
+        
+        articles = [self._row_to_article(row) for row in rows[:limit]]
+        if backwards:
+            articles.reverse()
+        
+        total = None
+        if include_total:
+            for article in articles:
+                total = article.pop('total_count')
+            if total is None:
+                # No rows to carry the count; past the end it still has to be looked up
+                total = self.get_articles_count(category, days_back, min_relevance) if key else 0
+        
+        next_cursor = prev_cursor = None
+        if articles:
+            # A page reached from another page always has a page back in that direction
+            if has_more or backwards:
+                next_cursor = self.encode_cursor(articles[-1])
+            if key is not None:
+                prev_cursor = self.encode_cursor(articles[0])
+        
+        page = {'articles': articles, 'next_cursor': next_cursor, 'prev_cursor': prev_cursor}
+        if include_total:
+            page['total'] = total
+        return page
+    
+    def normalize_timestamp(self, value: str) -> Optional[str]:
+        """A timestamp in the 'YYYY-MM-DD HH:MM:SS' form created_at is stored in, or None if SQLite cannot parse it"""
+        with self._connection() as conn:
+            return conn.execute('SELECT datetime(?)', (value,)).fetchone()[0]
+    
+    def iter_articles(self, since_id: int = 0, since: Optional[str] = None,
+                      batch_size: int = 500) -> Iterator[Dict]:
+        """
+        Yield every article with id above since_id (and created_at at or after since), in id order
+        Rows are read in keyset batches so memory stays flat, and no read transaction
+        stays open while the caller is busy with a batch
+        """
+        last_id = since_id
+        
+        while True:
+            query = 'SELECT * FROM articles WHERE id > ?'
+            params = [last_id]
+            if since:
+                query += ' AND created_at >= datetime(?)'
+                params.append(since)
+            query += ' ORDER BY id LIMIT ?'
+            params.append(batch_size)
+            
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchmany(batch_size)
+            
+            if not rows:
+                return
+            
+            for row in rows:
+                yield self._row_to_article(row)
+            last_id = rows[-1]['id']
+    
     def get_articles_by_keywords(self, keywords: List[str], limit: int = 50) -> List[Dict]:
         """Retrieve articles that match specific keywords"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
                 # Create a pattern for keyword matching
@@ -167,31 +478,490 @@ class NewsDatabase:
                 cursor.execute('''
                     SELECT * FROM articles 
                     WHERE (title LIKE ? OR description LIKE ? OR content LIKE ?)
-                    ORDER BY relevance_score DESC, created_at DESC 
+                    ORDER BY rank_score DESC, created_at DESC 
                     LIMIT ?
                 ''', (keyword_pattern, keyword_pattern, keyword_pattern, limit))
                 
-                rows = cursor.fetchall()
                 
-                articles = []
-                for row in rows:
-                    article = dict(row)
-                    if article['keywords_matched']:
-                        article['keywords_matched'] = json.loads(article['keywords_matched'])
-                    else:
-                        article['keywords_matched'] = []
-                    articles.append(article)
-                
-                return articles
+                return [self._row_to_article(row) for row in cursor.fetchall()]
         except Exception as e:
             print(f"Error retrieving articles by keywords: {e}")
             return []
     
+    def get_source_validators(self) -> Dict[str, Dict]:
+        """Get the stored ETag and Last-Modified values keyed by source URL"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('SELECT url, etag, last_modified FROM sources')
+                
+                return {
+                    url: {'etag': etag, 'last_modified': last_modified}
+                    for url, etag, last_modified in cursor.fetchall()
+                }
+        except Exception as e:
+            print(f"Error getting source validators: {e}")
+            return {}
+    
+    def update_source_fetch(self, source: Dict, etag: Optional[str] = None,
+                            last_modified: Optional[str] = None):
+        """Record a successful fetch of a source along with its cache validators"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO sources (name, url, category, last_fetch, etag, last_modified)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET
+                        name = excluded.name,
+                        category = excluded.category,
+                        last_fetch = excluded.last_fetch,
+                        etag = excluded.etag,
+                        last_modified = excluded.last_modified
+                ''', (source['name'], source['url'], source.get('category', ''),
+                      etag, last_modified))
+                
+                conn.commit()
+        except Exception as e:
+            print(f"Error updating source fetch: {e}")
+    
+    def get_source_schedule(self) -> Dict[str, Dict]:
+        """
+        Get the polling state of each stored source keyed by URL
+        seconds_since_poll is measured from the last poll, or the last fetch for sources polled before;
+        feed_entries is the list of entry URLs the feed had at its last poll, or None if not known
+        """
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT url, last_polled, poll_interval, publish_rate, next_due, feed_entries,
+                           (julianday('now') - julianday(COALESCE(last_polled, last_fetch))) * 86400
+                               AS seconds_since_poll,
+                           next_due IS NULL OR next_due <= CURRENT_TIMESTAMP AS due
+                    FROM sources
+                ''')
+                
+                schedule = {row['url']: dict(row) for row in cursor.fetchall()}
+        except Exception as e:
+            print(f"Error getting source schedule: {e}")
+            return {}
+        
+        for state in schedule.values():
+            state['feed_entries'] = json.loads(state['feed_entries']) if state['feed_entries'] else None
+        return schedule
+    
+    def update_source_schedule(self, schedules: List[Tuple[Dict, int, Optional[float], float, Optional[List[str]]]]):
+        """
+        Record (source, poll_interval, publish_rate, seconds until next due, feed entry URLs)
+        for sources just polled; entry URLs of None keep the stored ones
+        """
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.executemany('''
+                    INSERT INTO sources (name, url, category, last_polled, poll_interval, publish_rate,
+                                         next_due, feed_entries)
+                    VALUES (?, ?, ?, CURRENT_TIMESTAMP, ?, ?, datetime('now', ?), ?)
+                    ON CONFLICT(url) DO UPDATE SET
+                        last_polled = excluded.last_polled,
+                        poll_interval = excluded.poll_interval,
+                        publish_rate = excluded.publish_rate,
+                        next_due = excluded.next_due,
+                        feed_entries = COALESCE(excluded.feed_entries, sources.feed_entries)
+                ''', [(source['name'], source['url'], source.get('category', ''), poll_interval,
+                       publish_rate, f'+{delay:.0f} seconds',
+                       json.dumps(feed_entries) if feed_entries is not None else None)
+                      for source, poll_interval, publish_rate, delay, feed_entries in schedules])
+        except Exception as e:
+            print(f"Error updating source schedule: {e}")
+    
+    # Markers wrapped around matched terms in search snippets, see app.highlight
+    SNIPPET_START = '\x02'
+    SNIPPET_END = '\x03'
+    
+    @staticmethod
+    def build_fts_query(text: str) -> str:
+        """
+        Turn user search input into an FTS5 query
+        "quoted text" is a phrase, a trailing * is a prefix search, other words must all match
+        """
+        terms = []
+        for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+            if phrase:
+                words = re.findall(r'\w+', phrase)
+                if words:
+                    terms.append('"' + ' '.join(words) + '"')
+            else:
+                words = re.findall(r'\w+', word)
+                if words:
+                    prefix = '*' if word.endswith('*') else ''
+                    terms.append('"' + ' '.join(words) + '"' + prefix)
+        return ' '.join(terms)
+    
+    def search_articles(self, query: str, limit: int = 50) -> List[Dict]:
+        """
+        Full-text search ranked by BM25 (weights are set on the index's rank in migrations.py)
+        Each article gets a 'snippet' with matches wrapped in SNIPPET_START/SNIPPET_END
+        """
+        fts_query = self.build_fts_query(query)
+        if not fts_query:
+            return []
+        
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT articles.*,
+                           snippet(articles_fts, -1, ?, ?, '…', 24) AS snippet
+                    FROM articles_fts
+                    JOIN articles ON articles.id = articles_fts.rowid
+                    WHERE articles_fts MATCH ?
+                    ORDER BY articles_fts.rank
+                    LIMIT ?
+                ''', (self.SNIPPET_START, self.SNIPPET_END, fts_query, limit))
+                
+                return [self._row_to_article(row) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error searching articles: {e}")
+            return []
+    
+    def get_generation(self) -> int:
+        """Get the data generation, which changes whenever an update commits"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT value FROM app_state WHERE key = 'generation'")
+                row = cursor.fetchone()
+                return int(row[0]) if row else 0
+        except Exception as e:
+            print(f"Error getting generation: {e}")
+            return 0
+    
+    def bump_generation(self) -> int:
+        """Advance the data generation so cached responses are refreshed"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE app_state SET value = CAST(value AS INTEGER) + 1
+                    WHERE key = 'generation'
+                ''')
+                cursor.execute("SELECT value FROM app_state WHERE key = 'generation'")
+                return int(cursor.fetchone()[0])
+        except Exception as e:
+            print(f"Error bumping generation: {e}")
+            return 0
+    
+    def get_change_watermark(self) -> int:
+        """Get the sequence number of the latest article change"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT MAX(seq) FROM article_changes')
+                return cursor.fetchone()[0] or 0
+        except Exception as e:
+            print(f"Error getting change watermark: {e}")
+            return 0
+    
+    def count_changes(self, since: int, through: int) -> Dict[str, int]:
+        """Count the changes after since up to and including through by operation"""
+        counts = {'inserted': 0, 'updated': 0, 'deleted': 0}
+        keys = {'insert': 'inserted', 'update': 'updated', 'delete': 'deleted'}
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT operation, COUNT(*) FROM article_changes
+                    WHERE seq > ? AND seq <= ?
+                    GROUP BY operation
+                ''', (since, through))
+                for operation, count in cursor.fetchall():
+                    counts[keys[operation]] = count
+        except Exception as e:
+            print(f"Error counting changes: {e}")
+        return counts
+    
+    def get_changes(self, since: int = 0, limit: int = 500) -> Dict:
+        """
+        Get article changes after the since watermark, oldest first
+        Returns: {'inserted': [articles], 'updated': [articles], 'deleted': [ids],
+                  'watermark': int, 'has_more': bool, 'reset': bool}
+        reset means changes after since were pruned: the client must resync from scratch, then
+        resume from the returned watermark, which is the latest change at the time of the call
+        """
+        changes = {'inserted': [], 'updated': [], 'deleted': [], 'watermark': since,
+                   'has_more': False, 'reset': False}
+        
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("SELECT value FROM app_state WHERE key = 'changes_pruned_through'")
+                row = cursor.fetchone()
+                if row and since < int(row[0]):
+                    # Resume from here after resyncing; changes made during the resync are replayed
+                    cursor.execute('SELECT MAX(seq) FROM article_changes')
+                    changes['watermark'] = cursor.fetchone()[0] or int(row[0])
+                    changes['reset'] = True
+                    return changes
+                
+                cursor.execute('''
+                    SELECT article_changes.seq AS change_seq,
+                           article_changes.article_id AS change_article_id,
+                           article_changes.operation AS change_operation,
+                           articles.*
+                    FROM article_changes
+                    LEFT JOIN articles ON articles.id = article_changes.article_id
+                    WHERE article_changes.seq > ?
+                    ORDER BY article_changes.seq
+                    LIMIT ?
+                ''', (since, limit + 1))
+                rows = cursor.fetchall()
+        except Exception as e:
+            print(f"Error getting changes: {e}")
+            return changes
+        
+        changes['has_more'] = len(rows) > limit
+        for row in rows[:limit]:
+            change = dict(row)
+            seq = change.pop('change_seq')
+            article_id = change.pop('change_article_id')
+            operation = change.pop('change_operation')
+            
+            if operation == 'delete':
+                changes['deleted'].append(article_id)
+            elif change['id'] is not None:
+                # Inserts and updates of articles deleted since then only show up as deletes
+                key = 'updated' if operation == 'update' else 'inserted'
+                changes[key].append(self._row_to_article(change))
+            changes['watermark'] = seq
+        
+        return changes
+    
+    def count_stale_articles(self, keywords_version: str) -> int:
+        """Count articles not yet scored with keywords_version"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT COUNT(*) FROM articles WHERE keywords_version IS NOT ?',
+                               (keywords_version,))
+                return cursor.fetchone()[0]
+        except Exception as e:
+            print(f"Error counting stale articles: {e}")
+            return 0
+    
+    def get_stale_articles(self, keywords_version: str, after_id: int = 0,
+                           limit: int = 500) -> List[Tuple[int, str, str, str]]:
+        """Get the next batch of (id, title, description, content) not scored with keywords_version"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, title, description, content FROM articles
+                WHERE id > ? AND keywords_version IS NOT ?
+                ORDER BY id
+                LIMIT ?
+            ''', (after_id, keywords_version, limit))
+            return [(row['id'], row['title'] or '', row['description'] or '', row['content'] or '')
+                    for row in cursor.fetchall()]
+    
+    def get_rescore_progress(self, keywords_version: str) -> int:
+        """Get the last article id re-scored with keywords_version, so an interrupted job can resume"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT value FROM app_state WHERE key = 'rescore_progress'")
+                row = cursor.fetchone()
+        except Exception as e:
+            print(f"Error getting re-score progress: {e}")
+            return 0
+        
+        if not row:
+            return 0
+        progress = json.loads(row[0])
+        return progress['last_id'] if progress.get('keywords_version') == keywords_version else 0
+    
+    def get_scoring_model_version(self) -> Optional[str]:
+        """Get the version of the stored scoring engine model, or None if there is none"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT json_extract(value, '$.version') FROM app_state WHERE key = 'scoring_model'")
+                row = cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            print(f"Error getting scoring model version: {e}")
+            return None
+    
+    def get_scoring_model(self) -> Optional[Dict]:
+        """Get the stored scoring engine model"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT value FROM app_state WHERE key = 'scoring_model'")
+                row = cursor.fetchone()
+                return json.loads(row[0]) if row else None
+        except Exception as e:
+            print(f"Error getting scoring model: {e}")
+            return None
+    
+    def save_scoring_model(self, model: Dict):
+        """Store the fitted scoring engine model so every process ranks with the same one"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO app_state (key, value) VALUES ('scoring_model', ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            ''', (json.dumps(model),))
+    
+    def update_scores(self, scores: List[Tuple[float, float, List[str], int]], keywords_version: str) -> int:
+        """
+        Write (relevance_score, rank_score, keywords_matched, id) results for one batch
+        The job progress is saved in the same transaction
+        """
+        if not scores:
+            return 0
+        
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                UPDATE articles SET relevance_score = ?, rank_score = ?, keywords_matched = ?,
+                                    keywords_version = ?
+                WHERE id = ?
+            ''', [(score, rank, json.dumps(keywords), keywords_version, article_id)
+                  for score, rank, keywords, article_id in scores])
+            
+            progress = json.dumps({'keywords_version': keywords_version,
+                                   'last_id': max(article_id for *_, article_id in scores)})
+            cursor.execute('''
+                INSERT INTO app_state (key, value) VALUES ('rescore_progress', ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            ''', (progress,))
+            return len(scores)
+    
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict:
+        """Convert a jobs row to a dict with its result decoded"""
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+    
+    def enqueue_job(self, kind: str = 'update') -> Dict:
+        """
+        Queue a job, or join the queued or running job of the same kind so overlapping requests run once
+        The returned job has coalesced set when an existing job was joined
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            # Take the write lock first so two requests cannot both see no active job
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                SELECT id FROM jobs WHERE kind = ? AND status IN ('queued', 'running')
+            ''', (kind,))
+            row = cursor.fetchone()
+            if row:
+                job_id = row[0]
+                cursor.execute('UPDATE jobs SET requests = requests + 1 WHERE id = ?', (job_id,))
+            else:
+                cursor.execute('INSERT INTO jobs (kind) VALUES (?)', (kind,))
+                job_id = cursor.lastrowid
+            
+            cursor.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+            job = self._row_to_job(cursor.fetchone())
+        
+        job['coalesced'] = row is not None
+        return job
+    
+    def claim_next_job(self) -> Optional[Dict]:
+        """Mark the oldest queued job as running and return it, or None when the queue is empty"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1")
+            row = cursor.fetchone()
+            if not row:
+                return None
+            
+            cursor.execute('''
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, progress = NULL, error = NULL,
+                                started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (row[0],))
+            cursor.execute('SELECT * FROM jobs WHERE id = ?', (row[0],))
+            return self._row_to_job(cursor.fetchone())
+    
+    def update_job_progress(self, job_id: int, progress: Optional[str] = None):
+        """Record that a running job is alive, and what it is doing if progress is given"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE jobs SET heartbeat_at = CURRENT_TIMESTAMP, progress = COALESCE(?, progress)
+                    WHERE id = ? AND status = 'running'
+                ''', (progress, job_id))
+        except Exception as e:
+            print(f"Error updating job progress: {e}")
+    
+    def finish_job(self, job_id: int, result: Optional[Dict] = None, error: Optional[str] = None):
+        """Mark a running job as succeeded, or failed when error is given"""
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', ('failed' if error else 'succeeded', json.dumps(result) if result is not None else None,
+                  error, job_id))
+    
+    def get_job(self, job_id: int) -> Optional[Dict]:
+        """Get a job by id"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT * FROM jobs WHERE id = ?', (job_id,))
+                row = cursor.fetchone()
+                return self._row_to_job(row) if row else None
+        except Exception as e:
+            print(f"Error getting job: {e}")
+            return None
+    
+    def get_latest_job(self, kind: str = 'update') -> Optional[Dict]:
+        """Get the most recently queued job of a kind"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT * FROM jobs WHERE kind = ? ORDER BY id DESC LIMIT 1', (kind,))
+                row = cursor.fetchone()
+                return self._row_to_job(row) if row else None
+        except Exception as e:
+            print(f"Error getting latest job: {e}")
+            return None
+    
+    def requeue_stale_jobs(self, stale_after: int = config.JOB_STALE_AFTER,
+                           max_attempts: int = config.JOB_MAX_ATTEMPTS) -> int:
+        """
+        Put running jobs whose worker stopped sending heartbeats back in the queue
+        Jobs that already used max_attempts are failed instead
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+                                error = 'Worker stopped responding',
+                                finished_at = CASE WHEN attempts >= ? THEN CURRENT_TIMESTAMP END
+                WHERE status = 'running' AND heartbeat_at < datetime('now', ?)
+            ''', (max_attempts, max_attempts, f'-{stale_after} seconds'))
+            return cursor.rowcount
+    
     def log_fetch(self, source_name: str, articles_found: int, 
                   articles_added: int, status: str = 'success'):
         """Log a fetch operation"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -204,18 +974,126 @@ class NewsDatabase:
         except Exception as e:
             print(f"Error logging fetch: {e}")
     
+    def log_run(self, metrics, articles_found: int, articles_added: int,
+                status: str = 'success') -> Optional[int]:
+        """
+        Log an update run from its RunMetrics: one all_sources row with the stage timings,
+        and a row per source polled with its counters, timers and errors by type
+        Triggers add the rows to the /metrics rollups in the same transaction
+        Returns the id of the run row
+        """
+        source_columns = ', '.join(SOURCE_FIELDS)
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    INSERT INTO fetch_log
+                    (source_name, articles_found, articles_added, status, duration_seconds,
+                     stage_seconds, errors)
+                    VALUES ('all_sources', ?, ?, ?, ?, ?, ?)
+                ''', (articles_found, articles_added, status, metrics.duration(),
+                      json.dumps(metrics.stages), json.dumps(metrics.errors)))
+                run_id = cursor.lastrowid
+                
+                cursor.executemany(f'''
+                    INSERT INTO fetch_log
+                    (run_id, source_name, status, duration_seconds, errors, {source_columns})
+                    VALUES (?, ?, ?, ?, ?, {', '.join('?' * len(SOURCE_FIELDS))})
+                ''', [(run_id, name, stats['status'],
+                       stats['feed_seconds'] + stats['fetch_seconds'] + stats['extract_seconds'],
+                       json.dumps(stats['errors']), *(stats[field] for field in SOURCE_FIELDS))
+                      for name, stats in metrics.sources.items()])
+                return run_id
+        except Exception as e:
+            print(f"Error logging run: {e}")
+            return None
+    
+    def get_fetch_metrics(self) -> Dict:
+        """
+        Get the totals behind the /metrics endpoint from the fetch_log rollups
+        Returns: {'runs': {status: count}, 'articles_found', 'articles_added', 'stages': {stage: seconds},
+                  'last_run', 'source_polls': {(source, status): count}, 'sources': {source: {field: sum}},
+                  'errors': {(source, type): count}}
+        """
+        totals = {'runs': {}, 'articles_found': 0, 'articles_added': 0, 'stages': {}, 'last_run': None,
+                  'source_polls': {}, 'sources': {}, 'errors': {}}
+        try:
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                
+                # The rollups fold a NULL status into ''
+                cursor.execute('SELECT outcome, runs, articles_found, articles_added FROM fetch_run_totals')
+                for outcome_name, count, found, added in cursor.fetchall():
+                    totals['runs'][outcome_name or None] = count
+                    totals['articles_found'] += found
+                    totals['articles_added'] += added
+                
+                cursor.execute('SELECT stage, seconds FROM fetch_stage_totals')
+                totals['stages'] = dict(cursor.fetchall())
+                
+                cursor.execute('''
+                    SELECT CAST(strftime('%s', fetch_time) AS INTEGER) AS timestamp,
+                           duration_seconds, stage_seconds
+                    FROM fetch_log
+                    WHERE source_name = 'all_sources' AND stage_seconds IS NOT NULL
+                    ORDER BY id DESC LIMIT 1
+                ''')
+                row = cursor.fetchone()
+                if row:
+                    totals['last_run'] = {'timestamp': row['timestamp'],
+                                          'duration_seconds': row['duration_seconds'],
+                                          'stages': json.loads(row['stage_seconds'])}
+                
+                cursor.execute(f'''
+                    SELECT source_name, outcome, polls, {', '.join(SOURCE_FIELDS)}
+                    FROM fetch_source_totals
+                ''')
+                for row in cursor.fetchall():
+                    source, outcome_name, count, values = row[0], row[1], row[2], row[3:]
+                    totals['source_polls'][(source, outcome_name or None)] = count
+                    source_totals = totals['sources'].setdefault(source, dict.fromkeys(SOURCE_FIELDS, 0))
+                    for field, value in zip(SOURCE_FIELDS, values):
+                        source_totals[field] += value if field.endswith('_seconds') else int(value)
+                
+                cursor.execute('SELECT source_name, error_type, count FROM fetch_error_totals')
+                totals['errors'] = {(source, error_type): count
+                                    for source, error_type, count in cursor.fetchall()}
+        except Exception as e:
+            print(f"Error getting fetch metrics: {e}")
+        
+        return totals
+    
     def cleanup_old_articles(self, days: int = config.DAYS_TO_KEEP_ARTICLES):
         """Remove articles older than specified days"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
                     DELETE FROM articles 
-                    WHERE created_at < datetime('now', '-{} days')
-                '''.format(days))
+                    WHERE created_at < datetime('now', ?)
+                ''', (f'-{days} days',))
                 
                 deleted_count = cursor.rowcount
+                
+                # Trim the change log to the same window; clients behind it must resync
+                cursor.execute('''
+                    SELECT MAX(seq) FROM article_changes
+                    WHERE changed_at < datetime('now', ?)
+                ''', (f'-{days} days',))
+                pruned_through = cursor.fetchone()[0]
+                if pruned_through:
+                    cursor.execute('DELETE FROM article_changes WHERE seq <= ?', (pruned_through,))
+                    cursor.execute('''
+                        UPDATE app_state SET value = ? WHERE key = 'changes_pruned_through'
+                    ''', (str(pruned_through),))
+                
+                # Finished jobs are kept for the same window
+                cursor.execute('''
+                    DELETE FROM jobs WHERE finished_at < datetime('now', ?)
+                ''', (f'-{days} days',))
+                
                 conn.commit()
                 
                 print(f"Cleaned up {deleted_count} old articles")
@@ -225,33 +1103,40 @@ class NewsDatabase:
             return 0
     
     def get_stats(self) -> Dict:
-        """Get database statistics"""
+        """Get database statistics from the rollup tables maintained by triggers"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
-                # Total articles
-                cursor.execute('SELECT COUNT(*) FROM articles')
-                total_articles = cursor.fetchone()[0]
-                
-                # Articles by category
+                # Totals and averages come from one row per category
                 cursor.execute('''
-                    SELECT category, COUNT(*) as count 
-                    FROM articles 
-                    GROUP BY category
+                    SELECT category, article_count, relevance_sum
+                    FROM category_stats
+                    ORDER BY category
                 ''')
-                articles_by_category = dict(cursor.fetchall())
+                articles_by_category = {}
+                relevance_sum = 0.0
+                for category, article_count, category_relevance in cursor.fetchall():
+                    # The rollup keys uncategorized articles as '' since NULLs cannot be a primary key
+                    articles_by_category[category or None] = article_count
+                    relevance_sum += category_relevance
+                total_articles = sum(articles_by_category.values())
                 
-                # Recent articles (last 24 hours)
+                # Recent articles (last 24 hours): whole hourly buckets, plus an exact
+                # indexed count for the part of the oldest hour inside the window
                 cursor.execute('''
-                    SELECT COUNT(*) FROM articles 
-                    WHERE created_at >= datetime('now', '-1 day')
+                    SELECT
+                        (SELECT TOTAL(article_count) FROM hourly_stats
+                         WHERE hour > strftime('%Y-%m-%d %H:00:00', 'now', '-1 day'))
+                        +
+                        (SELECT COUNT(*) FROM articles
+                         WHERE created_at >= datetime('now', '-1 day')
+                           AND created_at < strftime('%Y-%m-%d %H:00:00', 'now', '-1 day', '+1 hour'))
                 ''')
-                recent_articles = cursor.fetchone()[0]
+                recent_articles = int(cursor.fetchone()[0])
                 
                 # Average relevance score
-                cursor.execute('SELECT AVG(relevance_score) FROM articles')
-                avg_relevance = cursor.fetchone()[0] or 0.0
+                avg_relevance = relevance_sum / total_articles if total_articles else 0.0
                 
                 return {
                     'total_articles': total_articles,
@@ -261,4 +1146,4 @@ class NewsDatabase:
                 }
         except Exception as e:
             print(f"Error getting stats: {e}")
-            return {} 
\ No newline at end of file
+            return {}
\ No newline at end of file
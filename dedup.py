@@ -0,0 +1,165 @@
+import hashlib
+import re
+import struct
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import config
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 64
+# 16 bands of 4 rows: pairs with Jaccard similarity 0.7 share a band 99% of the time, 0.3 only 12%
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+# Each salted 64-byte BLAKE2b digest supplies 16 of the 32-bit hash functions
+_SALTS = [bytes([salt]) * 16 for salt in range(NUM_PERMUTATIONS // 16)]
+_HASH_FORMAT = f'<{NUM_PERMUTATIONS}I'
+
+def shingles(text: str) -> Set[str]:
+    """The overlapping word shingles in text"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < SHINGLE_SIZE:
+        return {' '.join(tokens)}
+    return {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+def _shingle_hashes(shingle: str) -> Tuple[int, ...]:
+    data = shingle.encode('utf-8')
+    return struct.unpack(_HASH_FORMAT, b''.join(hashlib.blake2b(data, salt=salt).digest() for salt in _SALTS))
+
+def minhash(text: str) -> Tuple[int, ...]:
+    """MinHash signature of the word shingles in text"""
+    return tuple(map(min, zip(*map(_shingle_hashes, shingles(text)))))
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the shingles behind two signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERMUTATIONS
+
+def pack_signature(signature: Tuple[int, ...]) -> bytes:
+    return struct.pack(_HASH_FORMAT, *signature)
+
+def unpack_signature(blob: bytes) -> Tuple[int, ...]:
+    return struct.unpack(_HASH_FORMAT, blob)
+
+def band_buckets(signature: Tuple[int, ...]) -> List[Tuple[int, int]]:
+    """Hash each band of rows into the (band, bucket) pairs a signature is indexed under"""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(struct.pack(f'<{LSH_ROWS}I', *rows), digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return buckets
+
+def signature_text(article: Dict, kind: str) -> str:
+    """Text a signature is taken over: the feed summary before fetching, the extracted content after"""
+    if kind == 'content' and article.get('content'):
+        return f"{article.get('title') or ''} {article['content']}"
+    return f"{article.get('title') or ''} {article.get('description') or ''}"
+
+class SignatureIndex:
+    """In-memory band index for articles seen earlier in the same batch"""
+    
+    def __init__(self):
+        self._buckets = defaultdict(list)
+    
+    def add(self, signature: Tuple[int, ...], url: str):
+        for key in band_buckets(signature):
+            self._buckets[key].append((url, signature))
+    
+    def candidates(self, signature: Tuple[int, ...]) -> List[Tuple[str, Tuple[int, ...]]]:
+        return [candidate for key in band_buckets(signature) for candidate in self._buckets.get(key, [])]
+
+class NearDuplicateDetector:
+    """
+    Find articles that are near-duplicates of stored articles or of earlier articles in a batch
+    MinHash signatures are indexed by LSH band in the database so a lookup only touches matching buckets
+    """
+    
+    KINDS = ('summary', 'content')
+    
+    def __init__(self, database=None, threshold: float = config.NEAR_DUPLICATE_SIMILARITY):
+        self.database = database
+        self.threshold = threshold
+    
+    def signature(self, article: Dict, kind: str) -> Tuple[int, ...]:
+        """Compute and remember the signature of an article"""
+        key = f'{kind}_minhash'
+        if article.get(key) is None:
+            article[key] = minhash(signature_text(article, kind))
+        return article[key]
+    
+    def _closest(self, signature: Tuple[int, ...], candidates: List[Tuple[str, Tuple[int, ...]]],
+                 url: str) -> Optional[Tuple[str, float]]:
+        best = None
+        for candidate_url, candidate in candidates:
+            if candidate_url == url:
+                continue
+            score = similarity(signature, candidate)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (candidate_url, score)
+        return best
+    
+    def split(self, articles: List[Dict], kind: str,
+              batch_index: Optional[SignatureIndex] = None) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Separate articles into unique ones and near-duplicates, keeping the first of each story
+        Duplicates get canonical_url, duplicate_kind and duplicate_similarity set
+        Pass the same batch_index to several calls to also match across them
+        """
+        if batch_index is None:
+            batch_index = SignatureIndex()
+        
+        signatures = [self.signature(article, kind) for article in articles]
+        stored = {}
+        if self.database:
+            found = self.database.find_signature_candidates(
+                kind, {signature: band_buckets(signature) for signature in set(signatures)})
+            stored = {signature: [(url, unpack_signature(blob)) for url, blob in candidates]
+                      for signature, candidates in found.items()}
+        
+        unique = []
+        duplicates = []
+        for article, signature in zip(articles, signatures):
+            candidates = stored.get(signature, []) + batch_index.candidates(signature)
+            match = self._closest(signature, candidates, article['url'])
+            if match:
+                article['canonical_url'], article['duplicate_similarity'] = match
+                article['duplicate_kind'] = kind
+                duplicates.append(article)
+            else:
+                batch_index.add(signature, article['url'])
+                unique.append(article)
+        
+        return unique, duplicates
+    
+    def record(self, articles: List[Dict], duplicates: List[Dict]):
+        """Index the signatures of stored articles and file duplicates under their canonical article"""
+        if not self.database:
+            return
+        
+        signatures = [
+            (article['url'], kind, pack_signature(self.signature(article, kind)),
+             band_buckets(self.signature(article, kind)))
+            for article in articles for kind in self.KINDS
+        ]
+        self.database.add_signatures(signatures)
+        self.database.add_duplicates(duplicates)
+    
+    def backfill(self, batch_size: int = 500, progress: Optional[Callable[[str], None]] = None) -> int:
+        """
+        Sign stored articles that have no signatures yet, committing each batch on its own
+        Stored descriptions stand in for the feed summaries; returns how many articles were signed
+        """
+        signed = 0
+        after_id = 0
+        while True:
+            articles = self.database.get_unsigned_articles(after_id, batch_size)
+            if not articles:
+                return signed
+            
+            self.record(articles, [])
+            signed += len(articles)
+            after_id = articles[-1]['id']
+            if progress:
+                progress(f"Signed {signed} articles")
@@ -0,0 +1,124 @@
+import threading
+from typing import Dict, Optional
+import requests
+from bs4 import UnicodeDammit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import config
+
+class NoWaitRetry(Retry):
+    """
+    Retry that never sleeps for Retry-After: a response asking the client to wait is returned
+    at once, so one slow host cannot hold a fetch thread and the update job for hours
+    """
+    
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if has_retry_after:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+def retry_after(response: requests.Response) -> Optional[float]:
+    """Seconds a 429 or 503 response asks the client to wait, or None if it does not say"""
+    value = response.headers.get('Retry-After')
+    if response.status_code not in (429, 503) or not value:
+        return None
+    try:
+        return NoWaitRetry().parse_retry_after(value)
+    except Exception:
+        return None
+
+class HttpClient:
+    """
+    Shared HTTP transport for feeds, article pages and source checks
+    Keeps a keep-alive connection pool per host and applies default timeouts and retries
+    """
+    
+    def __init__(self, pool_hosts: int = config.HTTP_POOL_HOSTS,
+                 pool_size: int = config.MAX_FETCH_WORKERS,
+                 timeout=(config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT),
+                 retries: int = config.HTTP_RETRIES,
+                 backoff: float = config.HTTP_BACKOFF):
+        self.timeout = timeout
+        retry = NoWaitRetry(total=retries, backoff_factor=backoff,
+                            status_forcelist=(429, 500, 502, 503, 504),
+                            allowed_methods=frozenset(['GET', 'HEAD']),
+                            respect_retry_after_header=False,
+                            raise_on_status=False)
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size,
+                                   max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.session.headers.update({'User-Agent': config.HTTP_USER_AGENT})
+    
+    def get(self, url: str, headers: Optional[Dict] = None, **kwargs) -> requests.Response:
+        """GET a URL through the shared pools"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, headers=headers, **kwargs)
+    
+    def head(self, url: str, **kwargs) -> requests.Response:
+        """HEAD a URL through the shared pools"""
+        kwargs.setdefault('timeout', self.timeout)
+        kwargs.setdefault('allow_redirects', True)
+        return self.session.head(url, **kwargs)
+    
+    def connection_stats(self) -> Dict[str, Dict[str, int]]:
+        """Requests sent and connections opened so far, per host"""
+        pools = self.adapter.poolmanager.pools
+        stats = {}
+        for key in pools.keys():
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue
+            host = f"{key.key_host}:{key.key_port}" if key.key_port else key.key_host
+            stats[host] = {'requests': pool.num_requests, 'connections': pool.num_connections}
+        return stats
+    
+    @staticmethod
+    def connection_reuse(before: Dict, after: Dict) -> Dict:
+        """Summarise the requests and connections between two connection_stats snapshots"""
+        hosts = {}
+        for host, counts in after.items():
+            previous = before.get(host, {'requests': 0, 'connections': 0})
+            requests_sent = counts['requests'] - previous['requests']
+            connections = counts['connections'] - previous['connections']
+            # A pool evicted and recreated in between starts counting from zero again
+            if requests_sent < 0 or connections < 0:
+                requests_sent, connections = counts['requests'], counts['connections']
+            if requests_sent:
+                hosts[host] = {'requests': requests_sent, 'connections': connections,
+                               'reused': max(0, requests_sent - connections)}
+        
+        total_requests = sum(h['requests'] for h in hosts.values())
+        total_connections = sum(h['connections'] for h in hosts.values())
+        return {
+            'requests': total_requests,
+            'connections': total_connections,
+            'reused': max(0, total_requests - total_connections),
+            'hosts': hosts,
+        }
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client() -> HttpClient:
+    """Return the process-wide HTTP client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+def decode_html(response: requests.Response) -> str:
+    """Decode a page body the way newspaper3k's own download and parse do"""
+    if response.encoding != 'ISO-8859-1':
+        return response.text or ''
+    
+    # requests assumes ISO-8859-1 without a charset, so look for one in the page itself
+    if 'charset' not in response.headers.get('content-type', ''):
+        encodings = requests.utils.get_encodings_from_content(response.text)
+        if encodings:
+            response.encoding = encodings[0]
+            return response.text or ''
+    return UnicodeDammit(response.content, is_html=True).unicode_markup or ''
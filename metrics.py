@@ -0,0 +1,135 @@
+"""
+Timers and counters for the update pipeline
+RunMetrics collects one update run in the worker; the run is saved as fetch_log rows
+and render_prometheus turns the stored totals into the text format served at /metrics
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Per-source counters and timers stored in fetch_log, with the help text of their metric
+SOURCE_FIELD_HELP = {
+    'feed_seconds': 'Time spent downloading and parsing the feed',
+    'feed_bytes': 'Feed bytes downloaded',
+    'articles_found': 'Entries found in the feed',
+    'articles_new': 'Entries whose URL was not stored yet',
+    'articles_duplicate': 'Relevant entries skipped as near-duplicates of another story',
+    'articles_fetched': 'Article pages requested',
+    'fetch_seconds': 'Time spent getting article pages',
+    'articles_extracted': 'Article pages whose text was extracted',
+    'extract_seconds': 'Time spent extracting article text',
+    'pages_cached': 'Article pages served from the page cache',
+    'extractions_cached': 'Extractions reused from the page cache',
+    'score_seconds': 'Time spent on the relevance check before fetching pages',
+    'articles_added': 'Articles stored',
+}
+SOURCE_FIELDS = tuple(SOURCE_FIELD_HELP)
+
+def new_source_stats() -> Dict:
+    stats = {field: 0.0 if field.endswith('_seconds') else 0 for field in SOURCE_FIELDS}
+    stats['status'] = 'success'
+    stats['errors'] = Counter()
+    return stats
+
+class RunMetrics:
+    """Stage timers, per-source counters and errors by type for one update run, safe to update from several threads"""
+    
+    def __init__(self, sources: Iterable[Dict] = ()):
+        self.started = time.monotonic()
+        self.stages: Dict[str, float] = {}
+        self.sources: Dict[str, Dict] = {source['name']: new_source_stats() for source in sources}
+        self.errors = Counter()
+        self._lock = threading.Lock()
+    
+    def _source(self, name: str) -> Dict:
+        if name not in self.sources:
+            self.sources[name] = new_source_stats()
+        return self.sources[name]
+    
+    @contextmanager
+    def stage(self, name: str):
+        """Time a pipeline stage; repeated stages add up"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + time.monotonic() - started
+    
+    def add(self, source: str, field: str, value: float = 1):
+        """Add to a per-source counter or timer"""
+        with self._lock:
+            self._source(source)[field] += value
+    
+    def set(self, source: str, field: str, value):
+        with self._lock:
+            self._source(source)[field] = value
+    
+    def error(self, source: Optional[str], error: Exception):
+        """Count an error by its type, against a source when it belongs to one"""
+        with self._lock:
+            if source is None:
+                self.errors[type(error).__name__] += 1
+            else:
+                stats = self._source(source)
+                stats['errors'][type(error).__name__] += 1
+                stats['status'] = 'error'
+    
+    def duration(self) -> float:
+        return time.monotonic() - self.started
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _sample(name: str, labels: Dict, value) -> str:
+    if labels:
+        rendered = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+        return f'{name}{{{rendered}}} {value}'
+    return f'{name} {value}'
+
+def render_prometheus(families: List[Tuple[str, str, str, List[Tuple[Dict, float]]]]) -> str:
+    """Render (name, type, help, [(labels, value)]) metric families in the Prometheus text format"""
+    lines = []
+    for name, kind, help_text, samples in families:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(_sample(name, labels, value) for labels, value in samples)
+    return '\n'.join(lines) + '\n'
+
+def update_metric_families(totals: Dict) -> List[Tuple[str, str, str, List[Tuple[Dict, float]]]]:
+    """Build the update pipeline metric families from NewsDatabase.get_fetch_metrics"""
+    families = [
+        ('pasture_update_runs_total', 'counter', 'Update runs by outcome',
+         [({'status': status}, count) for status, count in totals['runs'].items()]),
+        ('pasture_update_articles_found_total', 'counter', 'Articles found in feeds by update runs',
+         [({}, totals['articles_found'])]),
+        ('pasture_update_articles_added_total', 'counter', 'Articles stored by update runs',
+         [({}, totals['articles_added'])]),
+        ('pasture_update_stage_seconds_total', 'counter', 'Time spent in each update pipeline stage',
+         [({'stage': stage}, round(seconds, 6)) for stage, seconds in totals['stages'].items()]),
+    ]
+    
+    last_run = totals['last_run']
+    if last_run:
+        families.extend([
+            ('pasture_last_update_timestamp_seconds', 'gauge', 'When the last update run finished',
+             [({}, last_run['timestamp'])]),
+            ('pasture_last_update_duration_seconds', 'gauge', 'Duration of the last update run',
+             [({}, round(last_run['duration_seconds'] or 0.0, 6))]),
+            ('pasture_last_update_stage_seconds', 'gauge', 'Stage durations of the last update run',
+             [({'stage': stage}, round(seconds, 6)) for stage, seconds in last_run['stages'].items()]),
+        ])
+    
+    families.append(('pasture_source_polls_total', 'counter', 'Feed polls by source and outcome',
+                     [({'source': source, 'status': status}, count)
+                      for (source, status), count in totals['source_polls'].items()]))
+    for field in SOURCE_FIELDS:
+        families.append((f'pasture_source_{field}_total', 'counter', SOURCE_FIELD_HELP[field],
+                         [({'source': source}, round(values[field], 6))
+                          for source, values in totals['sources'].items()]))
+    families.append(('pasture_source_errors_total', 'counter', 'Errors by source and exception type',
+                     [({'source': source, 'type': error_type}, count)
+                      for (source, error_type), count in totals['errors'].items()]))
+    return families
@@ -0,0 +1,561 @@
+"""
+Versioned schema migrations for the newsfeed database
+Migrations run once each, in order, and are recorded in the schema_version table
+"""
+import sqlite3
+from typing import Callable, List, Tuple
+
+def _initial_schema(cursor: sqlite3.Cursor):
+    """Create the original articles, sources and fetch_log tables"""
+    # Create articles table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT,
+            content TEXT,
+            url TEXT UNIQUE NOT NULL,
+            source TEXT NOT NULL,
+            category TEXT,
+            published_date TEXT,
+            relevance_score REAL DEFAULT 0.0,
+            keywords_matched TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create sources table to track RSS sources
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sources (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            url TEXT UNIQUE NOT NULL,
+            category TEXT,
+            last_fetch TIMESTAMP,
+            status TEXT DEFAULT 'active'
+        )
+    ''')
+    
+    # Create fetch_log table to track update history
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fetch_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_name TEXT,
+            articles_found INTEGER,
+            articles_added INTEGER,
+            fetch_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT
+        )
+    ''')
+
+def _source_validators(cursor: sqlite3.Cursor):
+    """Add HTTP cache validator columns to the sources table"""
+    # Databases created before migrations existed may already have them
+    cursor.execute('PRAGMA table_info(sources)')
+    source_columns = {row[1] for row in cursor.fetchall()}
+    for column in ('etag', 'last_modified'):
+        if column not in source_columns:
+            cursor.execute(f'ALTER TABLE sources ADD COLUMN {column} TEXT')
+
+def _article_indexes(cursor: sqlite3.Cursor):
+    """Add indexes matching the article listing, count, stats and cleanup queries"""
+    # get_articles sort order, optionally narrowed to one category
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_published
+        ON articles (published_date DESC, relevance_score DESC, created_at DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_category_published
+        ON articles (category, published_date DESC, relevance_score DESC, created_at DESC)
+    ''')
+    
+    # Time window counts, recent stats and cleanup
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_created ON articles (created_at)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_category_created
+        ON articles (category, created_at)
+    ''')
+
+def _keyset_indexes(cursor: sqlite3.Cursor):
+    """Replace the listing indexes with ones ending in id for keyset pagination"""
+    cursor.execute('DROP INDEX IF EXISTS idx_articles_published')
+    cursor.execute('DROP INDEX IF EXISTS idx_articles_category_published')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_listing
+        ON articles (published_date DESC, relevance_score DESC, id DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_category_listing
+        ON articles (category, published_date DESC, relevance_score DESC, id DESC)
+    ''')
+
+def _full_text_search(cursor: sqlite3.Cursor):
+    """Add an FTS5 index over article text, kept in sync with articles by triggers"""
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            title, description, content,
+            content='articles', content_rowid='id',
+            tokenize='porter unicode61'
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, title, description, content)
+            VALUES (new.id, new.title, new.description, new.content);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, description, content)
+            VALUES ('delete', old.id, old.title, old.description, old.content);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_update
+        AFTER UPDATE OF title, description, content ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title, description, content)
+            VALUES ('delete', old.id, old.title, old.description, old.content);
+            INSERT INTO articles_fts (rowid, title, description, content)
+            VALUES (new.id, new.title, new.description, new.content);
+        END
+    ''')
+    
+    # Rank by BM25 with title matches weighted above description and body
+    cursor.execute("INSERT INTO articles_fts (articles_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')")
+    
+    # Index the articles that already exist
+    cursor.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+
+def _stats_rollups(cursor: sqlite3.Cursor):
+    """Keep per-category and per-hour article counts up to date with triggers"""
+    # NULL categories are folded into '' so they still hit the primary key on upsert
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS category_stats (
+            category TEXT PRIMARY KEY,
+            article_count INTEGER NOT NULL DEFAULT 0,
+            relevance_sum REAL NOT NULL DEFAULT 0.0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS hourly_stats (
+            hour TEXT PRIMARY KEY,
+            article_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_stats_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO category_stats (category, article_count, relevance_sum)
+            VALUES (IFNULL(new.category, ''), 1, IFNULL(new.relevance_score, 0.0))
+            ON CONFLICT(category) DO UPDATE SET
+                article_count = article_count + 1,
+                relevance_sum = relevance_sum + excluded.relevance_sum;
+            INSERT INTO hourly_stats (hour, article_count)
+            VALUES (strftime('%Y-%m-%d %H:00:00', new.created_at), 1)
+            ON CONFLICT(hour) DO UPDATE SET article_count = article_count + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_stats_delete AFTER DELETE ON articles BEGIN
+            UPDATE category_stats
+            SET article_count = article_count - 1,
+                relevance_sum = relevance_sum - IFNULL(old.relevance_score, 0.0)
+            WHERE category = IFNULL(old.category, '');
+            DELETE FROM category_stats
+            WHERE category = IFNULL(old.category, '') AND article_count <= 0;
+            UPDATE hourly_stats SET article_count = article_count - 1
+            WHERE hour = strftime('%Y-%m-%d %H:00:00', old.created_at);
+            DELETE FROM hourly_stats
+            WHERE hour = strftime('%Y-%m-%d %H:00:00', old.created_at) AND article_count <= 0;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_stats_update
+        AFTER UPDATE OF category, relevance_score, created_at ON articles BEGIN
+            UPDATE category_stats
+            SET article_count = article_count - 1,
+                relevance_sum = relevance_sum - IFNULL(old.relevance_score, 0.0)
+            WHERE category = IFNULL(old.category, '');
+            INSERT INTO category_stats (category, article_count, relevance_sum)
+            VALUES (IFNULL(new.category, ''), 1, IFNULL(new.relevance_score, 0.0))
+            ON CONFLICT(category) DO UPDATE SET
+                article_count = article_count + 1,
+                relevance_sum = relevance_sum + excluded.relevance_sum;
+            DELETE FROM category_stats WHERE article_count <= 0;
+            UPDATE hourly_stats SET article_count = article_count - 1
+            WHERE hour = strftime('%Y-%m-%d %H:00:00', old.created_at);
+            INSERT INTO hourly_stats (hour, article_count)
+            VALUES (strftime('%Y-%m-%d %H:00:00', new.created_at), 1)
+            ON CONFLICT(hour) DO UPDATE SET article_count = article_count + 1;
+            DELETE FROM hourly_stats WHERE article_count <= 0;
+        END
+    ''')
+    
+    # Seed the rollups from the articles that already exist
+    cursor.execute('''
+        INSERT OR REPLACE INTO category_stats (category, article_count, relevance_sum)
+        SELECT IFNULL(category, ''), COUNT(*), TOTAL(relevance_score)
+        FROM articles GROUP BY IFNULL(category, '')
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO hourly_stats (hour, article_count)
+        SELECT strftime('%Y-%m-%d %H:00:00', created_at), COUNT(*)
+        FROM articles GROUP BY 1
+    ''')
+
+def _app_state(cursor: sqlite3.Cursor):
+    """Add a key/value table for state shared between processes"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS app_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    ''')
+    
+    # Bumped whenever an update commits so response caches know to refresh
+    cursor.execute("INSERT OR IGNORE INTO app_state (key, value) VALUES ('generation', '0')")
+
+def _covering_count_indexes(cursor: sqlite3.Cursor):
+    """Extend the created_at indexes with relevance_score so filtered counts never touch the table"""
+    cursor.execute('DROP INDEX IF EXISTS idx_articles_created')
+    cursor.execute('DROP INDEX IF EXISTS idx_articles_category_created')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_created
+        ON articles (created_at, relevance_score)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_category_created
+        ON articles (category, created_at, relevance_score)
+    ''')
+
+def _article_changes(cursor: sqlite3.Cursor):
+    """Record article inserts and deletes in a change log with a monotonic sequence"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            article_id INTEGER NOT NULL,
+            operation TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_changes_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO article_changes (article_id, operation) VALUES (new.id, 'insert');
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_changes_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO article_changes (article_id, operation) VALUES (old.id, 'delete');
+        END
+    ''')
+    
+    # Existing articles count as inserted so a client syncing from 0 gets everything
+    cursor.execute('''
+        INSERT INTO article_changes (article_id, operation, changed_at)
+        SELECT id, 'insert', created_at FROM articles ORDER BY id
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO app_state (key, value) VALUES ('changes_pruned_through', '0')")
+
+def _keywords_version(cursor: sqlite3.Cursor):
+    """Record which keyword set scored each article and log score updates as changes"""
+    # NULL means the article was scored before versions were recorded
+    cursor.execute('ALTER TABLE articles ADD COLUMN keywords_version TEXT')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_changes_update
+        AFTER UPDATE OF relevance_score, keywords_matched ON articles
+        WHEN old.relevance_score IS NOT new.relevance_score
+          OR old.keywords_matched IS NOT new.keywords_matched BEGIN
+            INSERT INTO article_changes (article_id, operation) VALUES (new.id, 'update');
+        END
+    ''')
+
+def _near_duplicates(cursor: sqlite3.Cursor):
+    """Index MinHash signatures of articles by LSH band and record near-duplicate URLs"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_signatures (
+            article_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            signature BLOB NOT NULL,
+            PRIMARY KEY (article_id, kind)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS signature_bands (
+            kind TEXT NOT NULL,
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            article_id INTEGER NOT NULL,
+            PRIMARY KEY (kind, band, bucket, article_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS duplicate_articles (
+            url TEXT PRIMARY KEY,
+            canonical_url TEXT NOT NULL,
+            title TEXT,
+            source TEXT,
+            kind TEXT,
+            similarity REAL,
+            detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_duplicate_articles_canonical
+        ON duplicate_articles (canonical_url)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_signature_bands_article
+        ON signature_bands (article_id)
+    ''')
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_signatures_delete AFTER DELETE ON articles BEGIN
+            DELETE FROM signature_bands WHERE article_id = old.id;
+            DELETE FROM article_signatures WHERE article_id = old.id;
+            DELETE FROM duplicate_articles WHERE canonical_url = old.url;
+        END
+    ''')
+    # Articles that already exist are signed afterwards by the worker's 'signatures' job
+
+def _jobs(cursor: sqlite3.Cursor):
+    """Add a durable queue of update jobs run by the worker process"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            requests INTEGER NOT NULL DEFAULT 1,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            progress TEXT,
+            result TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            heartbeat_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+    
+    # At most one queued or running job per kind, so overlapping requests share it
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active
+        ON jobs(kind) WHERE status IN ('queued', 'running')
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)')
+
+def _source_polling(cursor: sqlite3.Cursor):
+    """Add per-source polling state so each feed is fetched on its own adaptive interval"""
+    for column in ('last_polled TIMESTAMP', 'poll_interval INTEGER', 'publish_rate REAL', 'next_due TIMESTAMP'):
+        cursor.execute(f'ALTER TABLE sources ADD COLUMN {column}')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sources_next_due ON sources(next_due)')
+
+def _fetch_log_metrics(cursor: sqlite3.Cursor):
+    """Extend fetch_log with stage timings and counters, one row per run plus one per source polled"""
+    for column in ('run_id INTEGER', 'duration_seconds REAL', 'feed_seconds REAL', 'feed_bytes INTEGER',
+                   'articles_new INTEGER', 'articles_duplicate INTEGER', 'articles_fetched INTEGER',
+                   'fetch_seconds REAL', 'articles_extracted INTEGER', 'extract_seconds REAL',
+                   'pages_cached INTEGER', 'extractions_cached INTEGER', 'score_seconds REAL',
+                   'stage_seconds TEXT', 'errors TEXT'):
+        cursor.execute(f'ALTER TABLE fetch_log ADD COLUMN {column}')
+    
+    # Source rows point at the run row they belong to, run rows have no run_id
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_fetch_log_run ON fetch_log(run_id)')
+
+def _rank_score(cursor: sqlite3.Cursor):
+    """Store the ranking score apart from relevance_score and order listings by it"""
+    # Without a scoring engine the two are the same; engine scores are moved over by rescore.py
+    cursor.execute('ALTER TABLE articles ADD COLUMN rank_score REAL DEFAULT 0.0')
+    cursor.execute('UPDATE articles SET rank_score = relevance_score')
+    
+    cursor.execute('DROP INDEX IF EXISTS idx_articles_listing')
+    cursor.execute('DROP INDEX IF EXISTS idx_articles_category_listing')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_listing
+        ON articles (published_date DESC, rank_score DESC, id DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_category_listing
+        ON articles (category, published_date DESC, rank_score DESC, id DESC)
+    ''')
+    
+    # A new rank moves the article in listings, so change log clients need it too
+    cursor.execute('DROP TRIGGER IF EXISTS articles_changes_update')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_changes_update
+        AFTER UPDATE OF relevance_score, rank_score, keywords_matched ON articles
+        WHEN old.relevance_score IS NOT new.relevance_score
+          OR old.rank_score IS NOT new.rank_score
+          OR old.keywords_matched IS NOT new.keywords_matched BEGIN
+            INSERT INTO article_changes (article_id, operation) VALUES (new.id, 'update');
+        END
+    ''')
+
+def _source_feed_entries(cursor: sqlite3.Cursor):
+    """Remember the entry URLs of each feed's last poll, so the next poll can count the new ones"""
+    cursor.execute('ALTER TABLE sources ADD COLUMN feed_entries TEXT')
+
+def _fetch_log_rollups(cursor: sqlite3.Cursor):
+    """Keep the cumulative /metrics counters up to date with triggers instead of summing fetch_log"""
+    # Per-source counters and timers of fetch_log, as of this migration
+    counters = ('feed_bytes', 'articles_found', 'articles_new', 'articles_duplicate', 'articles_fetched',
+                'articles_extracted', 'pages_cached', 'extractions_cached', 'articles_added')
+    timers = ('feed_seconds', 'fetch_seconds', 'extract_seconds', 'score_seconds')
+    fields = counters + timers
+    # Error statuses carry the message, so they are counted as one outcome; NULL is folded into ''
+    outcome = "IFNULL(CASE WHEN {0}status LIKE 'error%' THEN 'error' ELSE {0}status END, '')"
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fetch_run_totals (
+            outcome TEXT PRIMARY KEY,
+            runs INTEGER NOT NULL DEFAULT 0,
+            articles_found INTEGER NOT NULL DEFAULT 0,
+            articles_added INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fetch_stage_totals (
+            stage TEXT PRIMARY KEY,
+            seconds REAL NOT NULL DEFAULT 0.0
+        )
+    ''')
+    columns = ', '.join([f'{field} INTEGER NOT NULL DEFAULT 0' for field in counters] +
+                        [f'{field} REAL NOT NULL DEFAULT 0.0' for field in timers])
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS fetch_source_totals (
+            source_name TEXT NOT NULL,
+            outcome TEXT NOT NULL,
+            polls INTEGER NOT NULL DEFAULT 0,
+            {columns},
+            PRIMARY KEY (source_name, outcome)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fetch_error_totals (
+            source_name TEXT NOT NULL,
+            error_type TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (source_name, error_type)
+        )
+    ''')
+    
+    # log_run inserts the run row and its source rows in one transaction, which these join
+    field_list = ', '.join(fields)
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS fetch_log_rollups_insert AFTER INSERT ON fetch_log BEGIN
+            INSERT INTO fetch_run_totals (outcome, runs, articles_found, articles_added)
+            SELECT {outcome.format('new.')}, 1, IFNULL(new.articles_found, 0), IFNULL(new.articles_added, 0)
+            WHERE new.source_name = 'all_sources' AND new.run_id IS NULL
+            ON CONFLICT(outcome) DO UPDATE SET
+                runs = runs + 1,
+                articles_found = articles_found + excluded.articles_found,
+                articles_added = articles_added + excluded.articles_added;
+            INSERT INTO fetch_stage_totals (stage, seconds)
+            SELECT key, value FROM json_each(new.stage_seconds)
+            WHERE new.stage_seconds IS NOT NULL
+            ON CONFLICT(stage) DO UPDATE SET seconds = seconds + excluded.seconds;
+            INSERT INTO fetch_source_totals (source_name, outcome, polls, {field_list})
+            SELECT new.source_name, {outcome.format('new.')}, 1,
+                   {', '.join(f'IFNULL(new.{field}, 0)' for field in fields)}
+            WHERE new.source_name != 'all_sources'
+            ON CONFLICT(source_name, outcome) DO UPDATE SET
+                polls = polls + 1,
+                {', '.join(f'{field} = {field} + excluded.{field}' for field in fields)};
+            INSERT INTO fetch_error_totals (source_name, error_type, count)
+            SELECT new.source_name, key, value FROM json_each(new.errors)
+            WHERE new.errors IS NOT NULL AND new.source_name IS NOT NULL
+            ON CONFLICT(source_name, error_type) DO UPDATE SET count = count + excluded.count;
+        END
+    ''')
+    
+    # Seed the rollups from the runs already logged
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO fetch_run_totals (outcome, runs, articles_found, articles_added)
+        SELECT {outcome.format('')}, COUNT(*), TOTAL(articles_found), TOTAL(articles_added)
+        FROM fetch_log
+        WHERE source_name = 'all_sources' AND run_id IS NULL
+        GROUP BY 1
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO fetch_stage_totals (stage, seconds)
+        SELECT stage.key, TOTAL(stage.value)
+        FROM fetch_log, json_each(fetch_log.stage_seconds) AS stage
+        WHERE fetch_log.stage_seconds IS NOT NULL
+        GROUP BY stage.key
+    ''')
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO fetch_source_totals (source_name, outcome, polls, {field_list})
+        SELECT source_name, {outcome.format('')}, COUNT(*), {', '.join(f'TOTAL({field})' for field in fields)}
+        FROM fetch_log
+        WHERE source_name != 'all_sources'
+        GROUP BY 1, 2
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO fetch_error_totals (source_name, error_type, count)
+        SELECT fetch_log.source_name, error.key, TOTAL(error.value)
+        FROM fetch_log, json_each(fetch_log.errors) AS error
+        WHERE fetch_log.errors IS NOT NULL AND fetch_log.source_name IS NOT NULL
+        GROUP BY 1, 2
+    ''')
+
+# (version, description, migration) in the order they must be applied
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, 'initial schema', _initial_schema),
+    (2, 'source cache validators', _source_validators),
+    (3, 'article query indexes', _article_indexes),
+    (4, 'keyset pagination indexes', _keyset_indexes),
+    (5, 'full text search', _full_text_search),
+    (6, 'stats rollups', _stats_rollups),
+    (7, 'shared app state', _app_state),
+    (8, 'covering count indexes', _covering_count_indexes),
+    (9, 'article change log', _article_changes),
+    (10, 'article keywords version', _keywords_version),
+    (11, 'near-duplicate signatures', _near_duplicates),
+    (12, 'update job queue', _jobs),
+    (13, 'adaptive source polling', _source_polling),
+    (14, 'fetch log metrics', _fetch_log_metrics),
+    (15, 'article rank score', _rank_score),
+    (16, 'source feed entries', _source_feed_entries),
+    (17, 'fetch log rollups', _fetch_log_rollups),
+]
+
+def get_schema_version(cursor: sqlite3.Cursor) -> int:
+    """Get the version of the last applied migration"""
+    cursor.execute('SELECT MAX(version) FROM schema_version')
+    return cursor.fetchone()[0] or 0
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """Apply all pending migrations and return the resulting schema version"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    
+    for version, description, migrate in MIGRATIONS:
+        # Take the write lock first so concurrent processes cannot both apply a migration
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            if version <= get_schema_version(cursor):
+                conn.rollback()
+                continue
+            
+            migrate(cursor)
+            cursor.execute('INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                           (version, description))
+            conn.commit()
+            print(f"Applied database migration {version}: {description}")
+        except Exception:
+            conn.rollback()
+            raise
+    
+    return get_schema_version(cursor)
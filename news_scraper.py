@@ -1,24 +1,187 @@
 import feedparser
-import requests
 from bs4 import BeautifulSoup
 from bs4.element import Tag
 from datetime import datetime, timezone
 import time
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from typing import List, Dict, Optional
 from urllib.parse import urljoin, urlparse
 import newspaper
 from newspaper import Article
 import config
 from content_filter import ContentFilter
+from http_client import HttpClient, get_client, decode_html, retry_after
+from page_cache import PageCache
+from dedup import NearDuplicateDetector, SignatureIndex
+from metrics import RunMetrics
+
+class HostBackoffError(Exception):
+    """A host asked us to wait (Retry-After) and is skipped until that time has passed"""
+
+class HostRateLimiter:
+    """Enforce a minimum delay between requests to the same host"""
+    
+    def __init__(self, delay: float = config.PER_HOST_DELAY):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._next_slot = {}
+        self._blocked_until = {}
+    
+    def block(self, url: str, seconds: float):
+        """Skip the host of url for the given number of seconds"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            self._blocked_until[host] = max(self._blocked_until.get(host, 0.0), time.monotonic() + seconds)
+    
+    def wait(self, url: str):
+        """Block until a request to the host of url is allowed, or raise HostBackoffError if it asked us to wait"""
+        host = urlparse(url).netloc.lower()
+        
+        # Reserve the next free slot for this host so concurrent callers are spaced out
+        with self._lock:
+            now = time.monotonic()
+            blocked_until = self._blocked_until.get(host, 0.0)
+            if blocked_until > now:
+                raise HostBackoffError(f"{host} asked to retry after {blocked_until - now:.0f}s")
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.delay
+        
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+def extract_article(url: str, html: str) -> Dict:
+    """Parse a downloaded page and return the fields used to fill in an article.
+    
+    Runs in the extraction worker processes, so it only takes and returns plain data.
+    """
+    started = time.monotonic()
+    news_article = Article(url)
+    news_article.download(input_html=html)
+    news_article.parse()
+    
+    return {
+        'text': news_article.text,
+        'meta_description': news_article.meta_description,
+        'publish_date': news_article.publish_date.isoformat() if news_article.publish_date else '',
+        'top_image': news_article.top_image,
+        'seconds': time.monotonic() - started,
+    }
+
+def apply_extraction(article: Dict, extracted: Dict) -> Dict:
+    """Update an article with the fields extracted from its page"""
+    article['content'] = extracted['text'][:2000]  # Limit content length
+    
+    if extracted['meta_description']:
+        article['description'] = extracted['meta_description']
+    # Only set published_date from web scrape if RSS did not provide it
+    if (not article.get('published_date')) or (not article['published_date'].strip()):
+        if extracted['publish_date']:
+            article['published_date'] = extracted['publish_date']
+    article['image_url'] = extracted['top_image'] or ''
+    
+    return article
+
+def extraction_context():
+    """
+    Start method for extraction processes: forkserver where available, otherwise spawn
+    Forking the update worker would copy its locks and connections in whatever state
+    its other threads left them; the fork server starts from a clean, preloaded process
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+class ExtractionStage:
+    """Parse downloaded pages in a process pool fed through a bounded queue.
+    
+    Download threads block in put() once queue_size pages are waiting, and at most
+    workers * 2 pages are handed to the pool at a time. Articles are updated in place
+    as their extraction finishes; leaving the context waits for all of them.
+    """
+    
+    _DONE = object()
+    
+    def __init__(self, workers: int = config.EXTRACT_WORKERS, queue_size: int = config.EXTRACT_QUEUE_SIZE,
+                 on_done=None, on_error=None):
+        self.workers = max(1, workers)
+        self.pages = queue.Queue(maxsize=queue_size)
+        self.on_done = on_done
+        self.on_error = on_error
+        self._slots = threading.BoundedSemaphore(self.workers * 2)
+        self._pool = None
+        self._dispatcher = None
+    
+    def __enter__(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=extraction_context())
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.pages.put(self._DONE)
+        self._dispatcher.join()
+        self._pool.shutdown(wait=True)
+    
+    def put(self, article: Dict, html: str):
+        """Queue a downloaded page, blocking while the queue is full"""
+        self.pages.put((article, html))
+    
+    def _dispatch(self):
+        while True:
+            item = self.pages.get()
+            if item is self._DONE:
+                break
+            
+            article, html = item
+            self._slots.acquire()
+            try:
+                future = self._pool.submit(extract_article, article['url'], html)
+            except Exception as e:
+                self._slots.release()
+                print(f"Error extracting content from {article['url']}: {e}")
+                if self.on_error:
+                    self.on_error(article, e)
+                continue
+            future.add_done_callback(lambda future, article=article: self._finish(article, future))
+    
+    def _finish(self, article: Dict, future):
+        try:
+            extracted = future.result()
+            apply_extraction(article, extracted)
+            if self.on_done:
+                self.on_done(article, extracted)
+        except Exception as e:
+            print(f"Error extracting content from {article['url']}: {e}")
+            if self.on_error:
+                self.on_error(article, e)
+        finally:
+            self._slots.release()
 
 class NewsScraper:
-    def __init__(self):
+    def __init__(self, database=None, max_workers: int = config.MAX_FETCH_WORKERS,
+                 page_cache: Optional[PageCache] = None):
         self.sources = config.NEWS_SOURCES
+        self.database = database
+        if page_cache is None and config.PAGE_CACHE_PATH:
+            page_cache = PageCache()
+        self.page_cache = page_cache
         self.content_filter = ContentFilter()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.max_workers = max_workers
+        self.rate_limiter = HostRateLimiter()
+        self.metrics = RunMetrics()
+        self.last_run_stats = self.metrics.sources
+        self.feed_validators = {}
+        self.pending_validators = {}
+        self.pending_duplicates = []
+        self.deduplicator = NearDuplicateDetector(database)
+        self.last_run_connections = {}
+        self.http = get_client()
     
     def fetch_rss_feed(self, source: Dict) -> List[Dict]:
         """Fetch articles from an RSS feed"""
@@ -27,8 +190,35 @@ class NewsScraper:
         try:
             print(f"Fetching RSS feed: {source['name']} - {source['url']}")
             
-            # Parse RSS feed
-            feed = feedparser.parse(source['url'])
+            # Fetch the feed, sending the validators from the previous fetch
+            validators = self.feed_validators.get(source['url'], {})
+            headers = {}
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+            self.rate_limiter.wait(source['url'])
+            response = self.http.get(source['url'], headers=headers)
+            self._respect_retry_after(source['url'], response)
+            
+            if response.status_code == 304:
+                print(f"Feed not modified: {source['name']}")
+                self.metrics.set(source['name'], 'status', 'not_modified')
+                if self.database:
+                    self.database.update_source_fetch(source, validators.get('etag'),
+                                                      validators.get('last_modified'))
+                return articles
+            response.raise_for_status()
+            self.metrics.add(source['name'], 'feed_bytes', len(response.content))
+            
+            # Only persisted once the articles are stored, see save_feed_validators
+            self.pending_validators[source['url']] = (source, response.headers.get('ETag'),
+                                                      response.headers.get('Last-Modified'))
+            
+            # Parse the downloaded bytes; Content-Location lets feedparser resolve relative links
+            response_headers = {name.lower(): value for name, value in response.headers.items()}
+            response_headers['content-location'] = response.url
+            feed = feedparser.parse(response.content, response_headers=response_headers)
             
             if feed.bozo:
                 print(f"Warning: RSS feed parsing issues for {source['name']}")
@@ -56,75 +246,241 @@ class NewsScraper:
                     
                 except Exception as e:
                     print(f"Error processing RSS entry from {source['name']}: {e}")
+                    self.metrics.error(source['name'], e)
                     continue
             
+            # The scheduler measures the publish rate from entries missing at the previous poll
+            self.metrics.set(source['name'], 'feed_entries', [article['url'] for article in articles])
             print(f"Found {len(articles)} articles from {source['name']}")
             
         except Exception as e:
             print(f"Error fetching RSS feed {source['name']}: {e}")
+            self.metrics.error(source['name'], e)
         
         return articles
     
-    def fetch_web_content(self, article: Dict) -> Dict:
-        """Fetch full content from article URL and extract top image"""
+    def fetch_page(self, article: Dict) -> Optional[Dict]:
+        """Get the page of an article, from the page cache when possible
+        
+        Returns a dict with the page html, its content_hash, the memoized extracted
+        fields if any, and whether it came from the 'cache', was 'revalidated' with
+        the server or was downloaded from the 'network'.
+        """
         try:
             if not article.get('url'):
-                return article
-            
-            # Use newspaper3k to extract content
-            news_article = Article(article['url'])
-            news_article.download()
-            news_article.parse()
-            
-            # Update article with extracted content
-            article['content'] = news_article.text[:2000]  # Limit content length
-            
-            # Extract additional metadata
-            if news_article.meta_description:
-                article['description'] = news_article.meta_description
-            # Only set published_date from web scrape if RSS did not provide it
-            if (not article.get('published_date')) or (not article['published_date'].strip()):
-                if news_article.publish_date:
-                    article['published_date'] = news_article.publish_date.isoformat()
-            if news_article.top_image:
-                article['image_url'] = news_article.top_image
-            else:
-                article['image_url'] = ''
-            
-            # Add delay to be respectful to servers
-            time.sleep(1)
+                return None
+            url = article['url']
+            
+            cached = self.page_cache.get(url) if self.page_cache else None
+            if cached and self.page_cache.is_fresh(cached):
+                cached['origin'] = 'cache'
+                return cached
+            
+            # Ask the server whether a stale cached copy is still current
+            headers = {}
+            if cached:
+                cached_headers = {name.lower(): value for name, value in cached['headers'].items()}
+                if cached_headers.get('etag'):
+                    headers['If-None-Match'] = cached_headers['etag']
+                if cached_headers.get('last-modified'):
+                    headers['If-Modified-Since'] = cached_headers['last-modified']
+            
+            self.rate_limiter.wait(url)
+            response = self.http.get(url, headers=headers)
+            self._respect_retry_after(url, response)
+            if cached and response.status_code == 304:
+                self.page_cache.touch(url)
+                cached['origin'] = 'revalidated'
+                return cached
+            
+            response.raise_for_status()
+            html = decode_html(response)
+            if not html:
+                raise ValueError('empty response')
+            
+            page = {'url': url, 'html': html, 'content_hash': None, 'extracted': None,
+                    'origin': 'network'}
+            if self.page_cache:
+                page['content_hash'] = self.page_cache.put(url, html, response.headers)
+            return page
             
         except Exception as e:
             print(f"Error fetching content from {article.get('url', 'unknown')}: {e}")
+            self.metrics.error(article.get('source'), e)
+            return None
+    
+    def _respect_retry_after(self, url: str, response):
+        """Fail the rest of the host's requests until its Retry-After has passed instead of sleeping on it"""
+        seconds = retry_after(response)
+        if seconds is not None:
+            self.rate_limiter.block(url, seconds)
+    
+    def remember_extraction(self, page: Dict, extracted: Dict):
+        """Memoize the fields extracted from a cached page"""
+        if self.page_cache and page.get('content_hash'):
+            fields = {key: value for key, value in extracted.items() if key != 'seconds'}
+            self.page_cache.store_extraction(page['url'], page['content_hash'], fields)
+    
+    def fetch_web_content(self, article: Dict) -> Dict:
+        """Fetch full content from article URL and extract top image"""
+        page = self.fetch_page(article)
+        if page and page['extracted']:
+            apply_extraction(article, page['extracted'])
+        elif page:
+            try:
+                extracted = extract_article(page['url'], page['html'])
+                apply_extraction(article, extracted)
+                self.remember_extraction(page, extracted)
+            except Exception as e:
+                print(f"Error extracting content from {page['url']}: {e}")
         
         return article
     
-    def scrape_all_sources(self) -> List[Dict]:
-        """Scrape all configured news sources"""
-        all_articles = []
+    def load_feed_validators(self):
+        """Load the ETag and Last-Modified values stored for each source"""
+        if self.database:
+            self.feed_validators = self.database.get_source_validators()
+    
+    def save_feed_validators(self):
+        """Persist the validators of feeds fetched in the last run"""
+        if self.database:
+            for source, etag, last_modified in self.pending_validators.values():
+                self.database.update_source_fetch(source, etag, last_modified)
+                self.feed_validators[source['url']] = {'etag': etag, 'last_modified': last_modified}
+        self.pending_validators = {}
+    
+    def filter_new_articles(self, articles: List[Dict], seen_urls: Optional[set] = None) -> List[Dict]:
+        """Drop articles whose URL is already stored or was seen earlier in this run"""
+        if seen_urls is None:
+            seen_urls = set()
         
-        for source in self.sources:
-            try:
-                # Fetch RSS feed
-                articles = self.fetch_rss_feed(source)
-                
-                # Fetch full content for relevant articles
-                relevant_articles = []
-                for article in articles:
-                    # Quick relevance check before fetching full content
-                    if self.content_filter.is_relevant(article['title'], article['description']):
-                        # Fetch full content
-                        full_article = self.fetch_web_content(article)
-                        relevant_articles.append(full_article)
-                
-                all_articles.extend(relevant_articles)
-                
-                # Add delay between sources
-                time.sleep(2)
-                
-            except Exception as e:
-                print(f"Error processing source {source['name']}: {e}")
+        known_urls = set()
+        if self.database:
+            known_urls = self.database.get_existing_urls([article['url'] for article in articles])
+        
+        new_articles = []
+        for article in articles:
+            if article['url'] in known_urls or article['url'] in seen_urls:
                 continue
+            seen_urls.add(article['url'])
+            new_articles.append(article)
+        
+        return new_articles
+    
+    def scrape_all_sources(self, sources: Optional[List[Dict]] = None,
+                           metrics: Optional[RunMetrics] = None) -> List[Dict]:
+        """
+        Scrape the given sources, or all configured news sources, concurrently
+        Per-source timings, counters and errors are collected in metrics, or a fresh RunMetrics
+        """
+        sources = self.sources if sources is None else sources
+        started = time.monotonic()
+        self.load_feed_validators()
+        self.pending_validators = {}
+        self.metrics = metrics if metrics is not None else RunMetrics(sources)
+        self.last_run_stats = self.metrics.sources
+        results = {source['name']: [] for source in sources}
+        seen_urls = set()
+        seen_stories = SignatureIndex()
+        self.pending_duplicates = []
+        pages = {}
+        connections_before = self.http.connection_stats()
+        
+        def fetch_feed(source: Dict) -> List[Dict]:
+            feed_started = time.monotonic()
+            articles = self.fetch_rss_feed(source)
+            self.metrics.add(source['name'], 'feed_seconds', time.monotonic() - feed_started)
+            self.metrics.add(source['name'], 'articles_found', len(articles))
+            return articles
+        
+        def fetch_article(article: Dict) -> Dict:
+            # Download here and hand the page to the extraction processes
+            fetch_started = time.monotonic()
+            page = self.fetch_page(article)
+            self.metrics.add(article['source'], 'articles_fetched')
+            self.metrics.add(article['source'], 'fetch_seconds', time.monotonic() - fetch_started)
+            if page and page['origin'] != 'network':
+                self.metrics.add(article['source'], 'pages_cached')
+            
+            if page and page['extracted']:
+                self.metrics.add(article['source'], 'extractions_cached')
+                self.metrics.add(article['source'], 'articles_extracted')
+                apply_extraction(article, page['extracted'])
+            elif page:
+                pages[id(article)] = page
+                extraction.put(article, page['html'])
+            return article
+        
+        def article_extracted(article: Dict, extracted: Dict):
+            self.remember_extraction(pages.pop(id(article)), extracted)
+            self.metrics.add(article['source'], 'articles_extracted')
+            self.metrics.add(article['source'], 'extract_seconds', extracted['seconds'])
+        
+        def extraction_failed(article: Dict, error: Exception):
+            pages.pop(id(article), None)
+            self.metrics.error(article['source'], error)
+        
+        # Leaving the extraction stage last waits for pages still being parsed
+        with ExtractionStage(on_done=article_extracted, on_error=extraction_failed) as extraction, \
+                ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            feed_futures = {executor.submit(fetch_feed, source): source for source in sources}
+            article_futures = {}
+            
+            # Queue article downloads as soon as each feed arrives
+            for future in as_completed(feed_futures):
+                source = feed_futures[future]
+                try:
+                    articles = self.filter_new_articles(future.result(), seen_urls)
+                    self.metrics.add(source['name'], 'articles_new', len(articles))
+                    
+                    # Quick relevance check before fetching full content
+                    score_started = time.monotonic()
+                    scores = self.content_filter.score_articles(articles, rank=False)
+                    self.metrics.add(source['name'], 'score_seconds', time.monotonic() - score_started)
+                    relevant = [article for article, result in zip(articles, scores)
+                                if result['relevance_score'] >= self.content_filter.min_relevance_score]
+                    
+                    # Later copies of a story already stored or queued in this run are not fetched
+                    relevant, duplicates = self.deduplicator.split(relevant, 'summary', seen_stories)
+                    self.pending_duplicates.extend(duplicates)
+                    self.metrics.add(source['name'], 'articles_duplicate', len(duplicates))
+                    
+                    for article in relevant:
+                        article_futures[executor.submit(fetch_article, article)] = source
+                except Exception as e:
+                    print(f"Error processing source {source['name']}: {e}")
+                    self.metrics.error(source['name'], e)
+            
+            for future in as_completed(article_futures):
+                source = article_futures[future]
+                try:
+                    results[source['name']].append(future.result())
+                except Exception as e:
+                    print(f"Error processing source {source['name']}: {e}")
+                    self.metrics.error(source['name'], e)
+        
+        # Keep the configured source order in the output
+        all_articles = []
+        for source in sources:
+            all_articles.extend(results[source['name']])
+        
+        for name, stats in self.last_run_stats.items():
+            print(f"{name}: feed {stats['feed_seconds']:.2f}s ({stats['feed_bytes']} bytes), "
+                  f"{stats['articles_new']} new, "
+                  f"{stats['articles_duplicate']} duplicates, "
+                  f"{stats['articles_fetched']}/{stats['articles_found']} articles fetched "
+                  f"in {stats['fetch_seconds']:.2f}s ({stats['pages_cached']} cached), "
+                  f"extracted in {stats['extract_seconds']:.2f}s "
+                  f"({stats['extractions_cached']} memoized), {sum(stats['errors'].values())} errors")
+        if self.page_cache:
+            self.page_cache.evict()
+        
+        self.last_run_connections = HttpClient.connection_reuse(connections_before,
+                                                                self.http.connection_stats())
+        print(f"HTTP: {self.last_run_connections['requests']} requests over "
+              f"{self.last_run_connections['connections']} connections "
+              f"({self.last_run_connections['reused']} reused)")
+        print(f"Scraped {len(sources)} sources in {time.monotonic() - started:.2f}s")
         
         return all_articles
     
@@ -147,7 +503,7 @@ class NewsScraper:
     def validate_url(self, url: str) -> bool:
         """Validate if URL is accessible"""
         try:
-            response = self.session.head(url, timeout=10)
+            response = self.http.head(url)
             return response.status_code == 200
         except:
             return False
@@ -180,10 +536,7 @@ class AlternativeScraper:
     """Alternative scraper for sources that don't have RSS feeds"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.http = get_client()
     
     def scrape_agfunder(self) -> List[Dict]:
         """Scrape AgFunder News website"""
@@ -191,7 +544,7 @@ class AlternativeScraper:
         
         try:
             url = "https://agfundernews.com/category/agtech"
-            response = self.session.get(url, timeout=10)
+            response = self.http.get(url)
             soup = BeautifulSoup(response.content, 'html.parser')
             
             # Find article links
@@ -202,7 +555,7 @@ class AlternativeScraper:
                 if href and '/20' in href and 'agfundernews.com' in href:
                     try:
                         # Fetch individual article
-                        article_response = self.session.get(href, timeout=10)
+                        article_response = self.http.get(href)
                         article_soup = BeautifulSoup(article_response.content, 'html.parser')
                         
                         title_elem = article_soup.find('h1')
@@ -0,0 +1,50 @@
+import threading
+import time
+from typing import Callable, Optional
+import config
+
+class ChangeNotifier:
+    """
+    Wakes waiting requests when the article change watermark advances
+    A single background thread polls the database, so long-poll and SSE clients do not
+    each query it; this also catches commits made by other processes
+    """
+    
+    def __init__(self, watermark_source: Callable[[], int],
+                 poll_interval: float = config.CHANGES_POLL_INTERVAL):
+        self.watermark_source = watermark_source
+        self.poll_interval = poll_interval
+        self._condition = threading.Condition()
+        self._watermark: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    def _start(self):
+        """Start the polling thread on first use"""
+        with self._condition:
+            if self._thread is None:
+                self._watermark = self.watermark_source()
+                self._thread = threading.Thread(target=self._poll, daemon=True)
+                self._thread.start()
+    
+    def _poll(self):
+        """Refresh the watermark and notify waiters whenever it moves"""
+        while True:
+            time.sleep(self.poll_interval)
+            watermark = self.watermark_source()
+            with self._condition:
+                if watermark != self._watermark:
+                    self._watermark = watermark
+                    self._condition.notify_all()
+    
+    def current(self) -> int:
+        """Get the latest known watermark"""
+        self._start()
+        with self._condition:
+            return self._watermark
+    
+    def wait_for_change(self, since: int, timeout: float) -> int:
+        """Block until the watermark passes since or timeout expires, returning the latest watermark"""
+        self._start()
+        with self._condition:
+            self._condition.wait_for(lambda: self._watermark > since, timeout)
+            return self._watermark
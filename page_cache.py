@@ -0,0 +1,145 @@
+import hashlib
+import json
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+import config
+from database import ConnectionPool
+
+class PageCache:
+    """
+    On-disk cache of downloaded article pages, stored compressed in a SQLite blob table
+    Each page keeps its response headers, a hash of its content and the fields extracted from it
+    """
+    
+    def __init__(self, path: str = config.PAGE_CACHE_PATH,
+                 max_bytes: int = config.PAGE_CACHE_MAX_BYTES,
+                 ttl: float = config.PAGE_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.pool = ConnectionPool.for_path(path)
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.init_cache()
+    
+    def init_cache(self):
+        """Create the pages table if it does not exist"""
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    extracted TEXT,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages (accessed_at)')
+    
+    @staticmethod
+    def content_hash(html: str) -> str:
+        """Hash identifying the content of a page"""
+        return hashlib.sha256(html.encode('utf-8')).hexdigest()
+    
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the cached page for url, or None"""
+        with self.pool.connection() as conn:
+            row = conn.execute('''
+                SELECT content_hash, headers, body, extracted, fetched_at
+                FROM pages WHERE url = ?
+            ''', (url,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE pages SET accessed_at = ? WHERE url = ?', (time.time(), url))
+        
+        return {
+            'url': url,
+            'content_hash': row['content_hash'],
+            'headers': json.loads(row['headers']),
+            'html': zlib.decompress(row['body']).decode('utf-8'),
+            'extracted': json.loads(row['extracted']) if row['extracted'] else None,
+            'fetched_at': row['fetched_at'],
+        }
+    
+    def is_fresh(self, page: Dict) -> bool:
+        """Whether a cached page can be used without contacting the server"""
+        return time.time() - page['fetched_at'] < self.ttl
+    
+    def put(self, url: str, html: str, headers: Dict) -> str:
+        """Store a downloaded page and return its content hash
+        
+        The extracted fields are kept when the content has not changed.
+        """
+        content_hash = self.content_hash(html)
+        body = zlib.compress(html.encode('utf-8'))
+        now = time.time()
+        
+        with self.pool.connection() as conn:
+            conn.execute('''
+                INSERT INTO pages (url, content_hash, headers, body, size, fetched_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    extracted = CASE WHEN content_hash = excluded.content_hash THEN extracted END,
+                    content_hash = excluded.content_hash,
+                    headers = excluded.headers,
+                    body = excluded.body,
+                    size = excluded.size,
+                    fetched_at = excluded.fetched_at,
+                    accessed_at = excluded.accessed_at
+            ''', (url, content_hash, json.dumps(dict(headers)), body, len(body), now, now))
+        
+        return content_hash
+    
+    def touch(self, url: str):
+        """Mark a cached page as confirmed unchanged by the server"""
+        now = time.time()
+        with self.pool.connection() as conn:
+            conn.execute('UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?',
+                         (now, now, url))
+    
+    def store_extraction(self, url: str, content_hash: str, extracted: Dict):
+        """Memoize the fields extracted from the cached content of url"""
+        with self.pool.connection() as conn:
+            conn.execute('UPDATE pages SET extracted = ? WHERE url = ? AND content_hash = ?',
+                         (json.dumps(extracted), url, content_hash))
+    
+    def evict(self) -> int:
+        """Delete least recently used pages until the cache fits in max_bytes"""
+        deleted = 0
+        with self.pool.connection() as conn:
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            
+            cursor = conn.execute('SELECT url, size FROM pages ORDER BY accessed_at')
+            urls = []
+            for url, size in cursor:
+                if total <= self.max_bytes:
+                    break
+                urls.append((url,))
+                total -= size
+            cursor.close()
+            
+            conn.executemany('DELETE FROM pages WHERE url = ?', urls)
+            deleted = len(urls)
+        
+        with self._lock:
+            self.evictions += deleted
+        return deleted
+    
+    def stats(self) -> Dict:
+        """Report the size of the cache"""
+        with self.pool.connection() as conn:
+            pages, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages').fetchone()
+        with self._lock:
+            return {
+                'pages': pages,
+                'bytes': size,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+            }
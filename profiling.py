@@ -0,0 +1,259 @@
+"""
+Opt-in request profiling, switched on with config.PROFILE_REQUESTS
+TimedConnection times every SQLite statement and writes slow ones with their query plan
+to config.SLOW_QUERY_LOG; init_app breaks each Flask request down into DB, template and
+total time and runs a sample of requests under cProfile
+"""
+import cProfile
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+import config
+
+# Profiles of the most recent requests, served at /api/profile
+HISTORY_SIZE = 50
+
+WHITESPACE = re.compile(r'\s+')
+
+_local = threading.local()
+_log_lock = threading.Lock()
+# Only one request at a time is run under cProfile
+_sampling = threading.Lock()
+_history = deque(maxlen=HISTORY_SIZE)
+
+class QueryTiming:
+    """One statement and the time spent executing it and fetching its rows"""
+    
+    __slots__ = ('sql', 'parameters', 'many', 'seconds', 'logged')
+    
+    def __init__(self, sql: str, parameters, many: bool = False):
+        self.sql = sql
+        self.parameters = parameters
+        self.many = many
+        self.seconds = 0.0
+        self.logged = False
+    
+    def to_dict(self) -> Dict:
+        return {'sql': WHITESPACE.sub(' ', self.sql).strip(), 'ms': round(self.seconds * 1000, 3),
+                'many': self.many}
+
+class RequestProfile:
+    """Timings collected while one request is handled"""
+    
+    def __init__(self, endpoint: Optional[str], path: str):
+        self.endpoint = endpoint
+        self.path = path
+        self.started = time.perf_counter()
+        self.queries: List[QueryTiming] = []
+        self.template_seconds = 0.0
+        self.template_started = None
+        self.total_seconds = None
+        self.profiler = None
+    
+    @property
+    def db_seconds(self) -> float:
+        return sum(query.seconds for query in self.queries)
+    
+    def to_dict(self) -> Dict:
+        return {
+            'endpoint': self.endpoint,
+            'path': self.path,
+            'total_ms': round((self.total_seconds or 0.0) * 1000, 3),
+            'db_ms': round(self.db_seconds * 1000, 3),
+            'template_ms': round(self.template_seconds * 1000, 3),
+            'queries': [query.to_dict() for query in self.queries],
+        }
+
+def current_profile() -> Optional[RequestProfile]:
+    """The profile of the request being handled on this thread, if any"""
+    return getattr(_local, 'profile', None)
+
+def _query_plan(connection: sqlite3.Connection, timing: QueryTiming) -> List[str]:
+    """EXPLAIN QUERY PLAN of a statement, indented by nesting"""
+    if timing.many:
+        return ['(no plan for executemany)']
+    try:
+        # A plain cursor, so the EXPLAIN is not timed itself
+        cursor = sqlite3.Cursor(connection)
+        rows = cursor.execute('EXPLAIN QUERY PLAN ' + timing.sql, timing.parameters).fetchall()
+        cursor.close()
+    except sqlite3.Error as e:
+        return [f'(no plan: {e})']
+    
+    depth = {0: -1}
+    plan = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        plan.append('  ' * depth[node] + detail)
+    return plan
+
+def _log_if_slow(connection: sqlite3.Connection, timing: QueryTiming):
+    """Write a statement to the slow query log once it has taken longer than the threshold"""
+    if timing.logged or timing.seconds < config.SLOW_QUERY_THRESHOLD:
+        return
+    timing.logged = True
+    
+    profile = current_profile()
+    parameters = repr(timing.parameters)
+    lines = [
+        f"{datetime.now():%Y-%m-%d %H:%M:%S} {timing.seconds * 1000:.1f} ms"
+        f"{' in ' + profile.path if profile else ''}",
+        '    ' + WHITESPACE.sub(' ', timing.sql).strip(),
+        '    parameters: ' + (parameters[:200] + '...' if len(parameters) > 200 else parameters),
+    ]
+    lines.extend('    | ' + step for step in _query_plan(connection, timing))
+    
+    with _log_lock:
+        with open(config.SLOW_QUERY_LOG, 'a') as log:
+            log.write('\n'.join(lines) + '\n\n')
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that times its statements, including the fetches that step through their results"""
+    
+    _timing = None
+    
+    def _begin(self, sql: str, parameters, many: bool = False) -> QueryTiming:
+        self._finish()
+        self._timing = QueryTiming(sql, parameters, many)
+        profile = current_profile()
+        if profile:
+            profile.queries.append(self._timing)
+        return self._timing
+    
+    def _finish(self):
+        """The current statement is done; check its total time"""
+        if self._timing is not None:
+            _log_if_slow(self.connection, self._timing)
+            self._timing = None
+    
+    def _timed(self, timing: QueryTiming, call, *args):
+        started = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            timing.seconds += time.perf_counter() - started
+            # Log statements that are already slow before their rows are fetched
+            _log_if_slow(self.connection, timing)
+    
+    def execute(self, sql, parameters=()):
+        return self._timed(self._begin(sql, parameters), super().execute, sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(self._begin(sql, None, many=True), super().executemany, sql, seq_of_parameters)
+    
+    def fetchone(self):
+        if self._timing is None:
+            return super().fetchone()
+        row = self._timed(self._timing, super().fetchone)
+        if row is None:
+            self._finish()
+        return row
+    
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        if self._timing is None:
+            return super().fetchmany(size)
+        rows = self._timed(self._timing, super().fetchmany, size)
+        if len(rows) < size:
+            self._finish()
+        return rows
+    
+    def fetchall(self):
+        if self._timing is None:
+            return super().fetchall()
+        rows = self._timed(self._timing, super().fetchall)
+        self._finish()
+        return rows
+    
+    def close(self):
+        self._finish()
+        super().close()
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors, including the ones execute() makes, are TimedCursors"""
+    
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+def connection_factory() -> type:
+    """Connection class for ConnectionPool: timed when profiling is on"""
+    return TimedConnection if config.PROFILE_REQUESTS else sqlite3.Connection
+
+def init_app(app):
+    """Profile the requests handled by app; does nothing unless config.PROFILE_REQUESTS is set"""
+    if not config.PROFILE_REQUESTS:
+        return
+    
+    from flask import before_render_template, jsonify, request, template_rendered
+    
+    @app.before_request
+    def start_profile():
+        profile = RequestProfile(request.endpoint, request.full_path.rstrip('?'))
+        _local.profile = profile
+        
+        sampled = random.random() * 100 < config.PROFILE_SAMPLE_PERCENT
+        if sampled and _sampling.acquire(blocking=False):
+            profile.profiler = cProfile.Profile()
+            profile.profiler.enable()
+    
+    def template_started(sender, template, context, **extra):
+        profile = current_profile()
+        if profile:
+            profile.template_started = time.perf_counter()
+    
+    def template_finished(sender, template, context, **extra):
+        profile = current_profile()
+        if profile and profile.template_started is not None:
+            profile.template_seconds += time.perf_counter() - profile.template_started
+            profile.template_started = None
+    
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
+    
+    @app.after_request
+    def report_profile(response):
+        profile = current_profile()
+        if profile is None:
+            return response
+        
+        # Streamed bodies are generated after this point and their queries are not counted
+        profile.total_seconds = time.perf_counter() - profile.started
+        response.headers['Server-Timing'] = (
+            f'db;dur={profile.db_seconds * 1000:.1f};desc="{len(profile.queries)} queries", '
+            f'tmpl;dur={profile.template_seconds * 1000:.1f}, '
+            f'total;dur={profile.total_seconds * 1000:.1f}'
+        )
+        print(f"{request.method} {profile.path} {response.status_code}: "
+              f"{profile.total_seconds * 1000:.1f} ms total, "
+              f"{profile.db_seconds * 1000:.1f} ms in {len(profile.queries)} queries, "
+              f"{profile.template_seconds * 1000:.1f} ms rendering")
+        if profile.endpoint != 'api_profile':
+            _history.append(profile)
+        return response
+    
+    @app.teardown_request
+    def finish_profile(error=None):
+        profile = current_profile()
+        _local.profile = None
+        if profile is None or profile.profiler is None:
+            return
+        
+        profile.profiler.disable()
+        _sampling.release()
+        total = profile.total_seconds or time.perf_counter() - profile.started
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{profile.endpoint or 'unknown'}-{total * 1000:.0f}ms.prof"
+        # Read with python -m pstats <file>
+        profile.profiler.dump_stats(os.path.join(config.PROFILE_DIR, name))
+    
+    @app.route('/api/profile')
+    def api_profile():
+        """Timings of the most recent requests, slowest first, with every query they ran"""
+        profiles = sorted(_history, key=lambda profile: profile.total_seconds or 0.0, reverse=True)
+        return jsonify([profile.to_dict() for profile in profiles])
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Re-score stored articles after KEYWORDS or the category weights change
+Only articles scored with a different keyword set are updated, and an
+interrupted run picks up where it stopped
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+from content_filter import ContentFilter
+from database import NewsDatabase
+
+def rescore_articles(database: NewsDatabase, content_filter: Optional[ContentFilter] = None,
+                     batch_size: int = 2000, workers: int = 0, restart: bool = False,
+                     refit: bool = False) -> Dict:
+    """
+    Re-score every stale article in batches, writing each batch back in one transaction
+    workers > 0 scores each batch in a process pool
+    refit trains the scoring engine on the current archive instead of using the stored model;
+    the new model is stored for the updates and every article is re-ranked with it
+    Returns: {'keywords_version', 'rescored', 'seconds', 'rows_per_sec'}
+    """
+    content_filter = content_filter or ContentFilter()
+    if content_filter.engine:
+        model = None if refit else database.get_scoring_model()
+        if not (model and content_filter.load_model(model)):
+            print("Fitting the scoring engine on the archive")
+            content_filter.fit(database.iter_articles())
+            database.save_scoring_model(content_filter.model())
+    version = content_filter.keywords_version
+    after_id = 0 if restart else database.get_rescore_progress(version)
+    stale = database.count_stale_articles(version)
+    
+    if after_id:
+        print(f"Resuming re-score for keywords version {version} after article {after_id}")
+    print(f"{stale} articles to re-score with keywords version {version}")
+    
+    started = time.monotonic()
+    rescored = 0
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+    
+    try:
+        while True:
+            rows = database.get_stale_articles(version, after_id, batch_size)
+            if not rows:
+                break
+            
+            articles = [{'title': title, 'description': description, 'content': content}
+                        for _, title, description, content in rows]
+            results = content_filter.score_articles(articles, executor)
+            scores = [(result['relevance_score'], result['rank_score'], result['keywords_matched'], row[0])
+                      for row, result in zip(rows, results)]
+            
+            rescored += database.update_scores(scores, version)
+            after_id = rows[-1][0]
+            
+            elapsed = time.monotonic() - started
+            print(f"Re-scored {rescored}/{stale} articles ({rescored / elapsed:.0f} rows/sec)")
+    finally:
+        if executor:
+            executor.shutdown()
+    
+    elapsed = time.monotonic() - started
+    if rescored:
+        database.bump_generation()
+    
+    rows_per_sec = rescored / elapsed if elapsed > 0 else 0.0
+    print(f"Re-scored {rescored} articles in {elapsed:.2f}s ({rows_per_sec:.0f} rows/sec)")
+    return {
+        'keywords_version': version,
+        'rescored': rescored,
+        'seconds': elapsed,
+        'rows_per_sec': rows_per_sec,
+    }
+
+def main():
+    """Re-score the archive from the command line"""
+    parser = argparse.ArgumentParser(description='Re-score stored articles with the current keywords')
+    parser.add_argument('--batch-size', type=int, default=2000,
+                        help='articles read and written per transaction')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='scoring processes, 0 to score in this process')
+    parser.add_argument('--restart', action='store_true',
+                        help='ignore saved progress and rescan from the first article')
+    parser.add_argument('--refit', action='store_true',
+                        help='fit the scoring engine on the current archive and re-rank every article')
+    args = parser.parse_args()
+    
+    rescore_articles(NewsDatabase(), batch_size=args.batch_size, workers=args.workers,
+                     restart=args.restart, refit=args.refit)
+
+if __name__ == '__main__':
+    main()
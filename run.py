@@ -11,7 +11,7 @@ from app import app
 if __name__ == '__main__':
     print("🌱 Starting AgriTech Newsfeed...")
     print("📰 Focus: Virtual fencing, herd control, pasture management")
-    print("⏰ Updates: Daily at 7am CET")
+    print("⏰ Updates: Each source polled as often as it publishes (run worker.py)")
     
     # Set default environment variables if not set
     if not os.environ.get('FLASK_SECRET_KEY'):
@@ -1,135 +1,216 @@
-import schedule
-import time
-import threading
+import math
+import random
 from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
 import pytz
 import config
 from news_scraper import NewsScraper
 from database import NewsDatabase
 from content_filter import ContentFilter
+from metrics import RunMetrics
 
 class NewsfeedScheduler:
     def __init__(self):
-        self.scraper = NewsScraper()
         self.database = NewsDatabase()
+        self.scraper = NewsScraper(database=self.database)
         self.content_filter = ContentFilter()
         self.timezone = config.TIMEZONE
-        self.is_running = False
     
-    def update_newsfeed(self):
-        """Main function to update the newsfeed"""
+    def due_sources(self) -> List[Dict]:
+        """Get the configured sources whose next poll is due, including ones never polled"""
+        stored = self.database.get_source_schedule()
+        return [source for source in self.scraper.sources
+                if source['url'] not in stored or stored[source['url']]['due']]
+    
+    def reschedule_sources(self, sources: List[Dict]):
+        """Set the next due time of each polled source from the entries its feed gained since the last poll"""
+        stored = self.database.get_source_schedule()
+        schedules = []
+        for source in sources:
+            state = stored.get(source['url'], {})
+            stats = self.scraper.last_run_stats.get(source['name'], {})
+            entries = stats.get('feed_entries')
+            poll_interval, publish_rate = adapt_poll_interval(
+                new_feed_entries(entries, state.get('feed_entries'), stats.get('status')),
+                state.get('seconds_since_poll'), state.get('publish_rate'))
+            
+            # Jitter keeps feeds with similar rates from settling into polling together
+            delay = poll_interval * random.uniform(1 - config.POLL_JITTER, 1 + config.POLL_JITTER)
+            schedules.append((source, poll_interval, publish_rate, delay, entries))
+        
+        self.database.update_source_schedule(schedules)
+    
+    def load_scoring_model(self):
+        """
+        Rank with the engine model stored by rescore.py, so scores from every run come from one fit
+        The archive is only fitted here when no model for the current keywords is stored yet
+        """
+        version = self.database.get_scoring_model_version()
+        if version is not None and version == self.content_filter.model_version:
+            return
+        
+        model = self.database.get_scoring_model() if version is not None else None
+        if not (model and self.content_filter.load_model(model)):
+            self.content_filter.fit(self.database.iter_articles())
+            self.database.save_scoring_model(self.content_filter.model())
+    
+    def update_newsfeed(self, progress: Optional[Callable[[str], None]] = None,
+                        due_only: bool = False) -> Dict:
+        """
+        Main function to update the newsfeed
+        due_only scrapes just the sources whose adaptive polling interval has elapsed
+        progress is called with a description of each stage as it starts
+        Returns the article counts, or the error when the update failed
+        """
+        report = progress or (lambda message: None)
         print(f"Starting newsfeed update at {datetime.now(self.timezone)}")
+        metrics = RunMetrics()
         
         try:
-            # Scrape all sources
-            print("Scraping news sources...")
-            articles = self.scraper.scrape_all_sources()
+            sources = self.due_sources() if due_only else self.scraper.sources
+            if not sources:
+                print("No sources are due")
+                return {'sources': 0, 'articles_found': 0, 'articles_relevant': 0,
+                        'articles_added': 0, 'duplicates': 0}
+            metrics = RunMetrics(sources)
+            
+            # Scrape the sources
+            print(f"Scraping {len(sources)} news sources...")
+            report(f"Scraping {len(sources)} news sources")
+            with metrics.stage('scrape'):
+                articles = self.scraper.scrape_all_sources(sources, metrics)
             
             print(f"Found {len(articles)} articles from all sources")
             
             # Filter for relevant content
             print("Filtering for relevant content...")
-            filtered_articles = self.content_filter.filter_articles(articles)
+            report(f"Filtering {len(articles)} articles for relevant content")
+            # Nothing to rank when every feed was unchanged
+            if self.content_filter.engine and articles:
+                with metrics.stage('fit'):
+                    self.load_scoring_model()
+            with metrics.stage('score'):
+                filtered_articles = self.content_filter.filter_articles(articles)
             
             print(f"Found {len(filtered_articles)} relevant articles")
             
-            # Add articles to database
-            added_count = 0
+            # Collapse near-duplicate stories onto the highest scoring copy
+            deduplicator = self.scraper.deduplicator
+            with metrics.stage('dedup'):
+                filtered_articles, duplicates = deduplicator.split(filtered_articles, 'content')
+            duplicates.extend(self.scraper.pending_duplicates)
+            
+            # Add articles to database in one bulk transaction; if that fails the run fails
+            # before the feeds are rescheduled or their validators saved, so the next poll
+            # fetches the same entries again instead of getting a 304
+            report(f"Saving {len(filtered_articles)} relevant articles")
+            with metrics.stage('insert'):
+                counts = self.database.add_articles(filtered_articles)
+                added_count = counts['inserted']
+                deduplicator.record(filtered_articles, duplicates)
+            inserted_urls = set(counts['inserted_urls'])
             for article in filtered_articles:
-                if self.database.add_article(article):
-                    added_count += 1
+                if article['url'] in inserted_urls:
+                    metrics.add(article['source'], 'articles_added')
+            
+            print(f"Added {added_count} new articles to database ({counts['ignored']} already stored, "
+                  f"{len(duplicates)} near-duplicates collapsed)")
             
-            print(f"Added {added_count} new articles to database")
+            # Pick each source's next poll before its fetch time is overwritten
+            self.reschedule_sources(sources)
             
-            # Log the fetch operation
-            self.database.log_fetch(
-                source_name="all_sources",
-                articles_found=len(articles),
-                articles_added=added_count,
-                status="success"
-            )
+            # Articles are stored, so unchanged feeds can be skipped next time
+            self.scraper.save_feed_validators()
             
             # Cleanup old articles
-            self.database.cleanup_old_articles()
+            with metrics.stage('cleanup'):
+                deleted_count = self.database.cleanup_old_articles()
+            
+            # Log the run with its stage timings and per-source counters
+            self.database.log_run(metrics, articles_found=len(articles), articles_added=added_count)
             
-            print(f"Newsfeed update completed at {datetime.now(self.timezone)}")
+            # Let the web tier know its cached pages are stale; most polls change nothing
+            if added_count or deleted_count:
+                self.database.bump_generation()
+            
+            print(f"Newsfeed update completed at {datetime.now(self.timezone)} "
+                  f"({', '.join(f'{stage} {seconds:.2f}s' for stage, seconds in metrics.stages.items())})")
+            return {'sources': len(sources), 'articles_found': len(articles),
+                    'articles_relevant': len(filtered_articles), 'articles_added': added_count,
+                    'duplicates': len(duplicates)}
             
         except Exception as e:
             print(f"Error during newsfeed update: {e}")
-            self.database.log_fetch(
-                source_name="all_sources",
-                articles_found=0,
-                articles_added=0,
-                status=f"error: {str(e)}"
-            )
-    
-    def schedule_daily_update(self):
-        """Schedule the daily update at 7am CET"""
-        schedule.every().day.at(config.SCHEDULE_TIME).timezone(self.timezone).do(self.update_newsfeed)
-        print(f"Scheduled daily newsfeed update at {config.SCHEDULE_TIME} {self.timezone}")
-    
-    def run_scheduler(self):
-        """Run the scheduler in a loop"""
-        self.is_running = True
-        print("Starting newsfeed scheduler...")
-        
-        while self.is_running:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
-    
-    def start_background_scheduler(self):
-        """Start the scheduler in a background thread"""
-        scheduler_thread = threading.Thread(target=self.run_scheduler, daemon=True)
-        scheduler_thread.start()
-        print("Background scheduler started")
-    
-    def stop_scheduler(self):
-        """Stop the scheduler"""
-        self.is_running = False
-        print("Scheduler stopped")
-    
-    def run_manual_update(self):
-        """Run a manual update immediately"""
-        print("Running manual newsfeed update...")
-        self.update_newsfeed()
-    
-    def get_next_run_time(self):
-        """Get the next scheduled run time"""
-        jobs = schedule.get_jobs()
-        if jobs:
-            return jobs[0].next_run
+            metrics.error(None, e)
+            self.database.log_run(metrics, articles_found=0, articles_added=0, status=f"error: {str(e)}")
+            return {'error': str(e)}
+
+def new_feed_entries(entries: Optional[List[str]], previous: Optional[List[str]],
+                     status: Optional[str]) -> Optional[int]:
+    """
+    Count the entries a feed gained since its previous poll, whether or not they were relevant
+    Returns None when the poll says nothing about that: the feed failed, or there is no previous poll to compare with
+    """
+    if status == 'not_modified':
+        return 0
+    if entries is None or previous is None:
         return None
-    
-    def get_scheduler_status(self):
-        """Get current scheduler status"""
-        return {
-            'is_running': self.is_running,
-            'next_run': self.get_next_run_time(),
-            'timezone': str(self.timezone),
-            'schedule_time': config.SCHEDULE_TIME
-        }
+    return len(set(entries) - set(previous))
 
-def main():
-    """Main function to run the scheduler"""
-    scheduler = NewsfeedScheduler()
-    
-    # Schedule daily updates
-    scheduler.schedule_daily_update()
+def adapt_poll_interval(new_entries: Optional[int], seconds_since_poll: Optional[float],
+                        publish_rate: Optional[float]) -> Tuple[int, Optional[float]]:
+    """
+    Update a source's publish rate (new feed entries per hour) and pick its next polling interval
+    The rate is averaged with a weight that grows with the time since the last poll, so a poll
+    made minutes after another barely moves it; the interval is the time the feed takes to publish
+    POLL_TARGET_ARTICLES, kept between POLL_MIN_INTERVAL and POLL_MAX_INTERVAL
+    new_entries of None leaves the rate as it is
+    Returns: (poll_interval seconds, publish_rate)
+    """
+    measured = publish_rate is not None
+    if not measured:
+        # Until measured, assume the rate that POLL_INITIAL_INTERVAL suits
+        publish_rate = config.POLL_TARGET_ARTICLES * 3600 / config.POLL_INITIAL_INTERVAL
     
-    # Run a manual update on startup
-    print("Running initial newsfeed update...")
-    scheduler.run_manual_update()
+    if new_entries is not None and seconds_since_poll and seconds_since_poll >= 1:
+        observed = new_entries * 3600 / seconds_since_poll
+        weight = 1 - math.exp(-seconds_since_poll / config.POLL_RATE_WINDOW)
+        publish_rate += weight * (observed - publish_rate)
+    elif not measured:
+        # First poll, there is no earlier copy of the feed to find the new entries against
+        return config.POLL_INITIAL_INTERVAL, publish_rate
     
-    # Start the scheduler
-    scheduler.start_background_scheduler()
+    if publish_rate > 0:
+        poll_interval = config.POLL_TARGET_ARTICLES * 3600 / publish_rate
+    else:
+        poll_interval = config.POLL_MAX_INTERVAL
+    return int(min(max(poll_interval, config.POLL_MIN_INTERVAL), config.POLL_MAX_INTERVAL)), publish_rate
+
+def source_schedule(database: NewsDatabase, sources: Optional[List[Dict]] = None) -> List[Dict]:
+    """Get the polling state of each configured source, soonest due first"""
+    stored = database.get_source_schedule()
+    rows = []
+    for source in config.NEWS_SOURCES if sources is None else sources:
+        state = stored.get(source['url'], {})
+        rows.append({
+            'name': source['name'],
+            'url': source['url'],
+            'category': source.get('category'),
+            'last_polled': state.get('last_polled'),
+            'poll_interval': state.get('poll_interval'),
+            'publish_rate': round(state['publish_rate'], 3) if state.get('publish_rate') is not None else None,
+            'next_due': state.get('next_due'),
+            'due': bool(state.get('due', True)),
+        })
     
-    try:
-        # Keep the main thread alive
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        print("Shutting down scheduler...")
-        scheduler.stop_scheduler()
+    # Sources never polled have no due time and come first
+    rows.sort(key=lambda row: row['next_due'] or '')
+    return rows
+
+def main():
+    """Run the update worker; updates are no longer scheduled in this process"""
+    import worker
+    worker.main()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
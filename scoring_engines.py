@@ -0,0 +1,178 @@
+"""
+Alternative relevance scoring engines for ContentFilter
+The keyword counter in ContentFilter decides whether an article is relevant;
+an engine chosen by config.SCORING_ENGINE then supplies the score used for ranking
+"""
+import math
+import re
+from collections import Counter
+from itertools import chain, repeat
+from typing import Dict, Iterable, List, Optional
+
+# numpy and scipy are optional, only the tfidf engine needs them
+try:
+    import numpy as np
+    import scipy.sparse as sp
+except ImportError:
+    np = None
+    sp = None
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+class TfidfEngine:
+    """
+    Score articles by TF-IDF cosine similarity to one centroid per keyword category
+    Centroids start from the category keywords and are refined with the archive passed to fit()
+    """
+    
+    name = 'tfidf'
+    
+    def __init__(self, keywords: Dict[str, List[str]], category_weights: Dict[str, float],
+                 min_df: int = 2, feedback: float = 0.5, feedback_docs: int = 50):
+        if np is None:
+            raise ImportError("The tfidf scoring engine needs numpy and scipy installed")
+        
+        self.categories = list(keywords)
+        self.min_df = min_df
+        self.feedback = feedback
+        self.feedback_docs = feedback_docs
+        
+        weights = np.array([category_weights.get(category, 1.0) for category in self.categories])
+        self.weights = weights / weights.max() if len(weights) else weights
+        
+        # Multi-word keywords are kept as phrase terms next to the single words
+        self.seed_terms = [
+            [' '.join(TOKEN_PATTERN.findall(keyword.lower())) for keyword in keywords[category]]
+            for category in self.categories
+        ]
+        self.phrases = {term for terms in self.seed_terms for term in terms if ' ' in term}
+        self.max_phrase_words = max((len(phrase.split()) for phrase in self.phrases), default=1)
+        
+        self.vocabulary = {}
+        self.idf = np.zeros(0)
+        self.centroids = np.zeros((len(self.categories), 0))
+        self.fit([])
+    
+    @staticmethod
+    def article_text(title: str, description: str, content: str) -> str:
+        """Combine the article fields, repeating the title and description as the keyword scorer weights them"""
+        return f"{title} {title} {title} {description} {description} {content}"
+    
+    def _terms(self, text: str) -> List[str]:
+        """List the words and keyword phrases in text"""
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        terms = list(tokens)
+        for size in range(2, self.max_phrase_words + 1):
+            ngrams = map(' '.join, zip(*(tokens[i:] for i in range(size))))
+            terms.extend(filter(self.phrases.__contains__, ngrams))
+        return terms
+    
+    def _matrix(self, documents: List[List[str]]) -> 'sp.csr_matrix':
+        """Build L2-normalised TF-IDF rows with sublinear term frequencies"""
+        size = len(self.vocabulary)
+        lengths = np.fromiter(map(len, documents), dtype=np.int64, count=len(documents))
+        columns = np.fromiter(map(self.vocabulary.get, chain.from_iterable(documents), repeat(-1)),
+                              dtype=np.int64, count=int(lengths.sum()))
+        rows = np.repeat(np.arange(len(documents)), lengths)
+        
+        # Count each (document, term) pair once the terms outside the vocabulary are dropped
+        known = columns >= 0
+        pairs, counts = np.unique(rows[known] * size + columns[known], return_counts=True)
+        rows, columns = np.divmod(pairs, size)
+        data = (1.0 + np.log(counts)) * self.idf[columns]
+        
+        norms = np.sqrt(np.bincount(rows, weights=data * data, minlength=len(documents)))
+        norms[norms == 0] = 1.0
+        return sp.csr_matrix((data / norms[rows], (rows, columns)), shape=(len(documents), size))
+    
+    def fit(self, texts: Iterable[str]):
+        """Learn the vocabulary and IDF weights from the archive and refine the category centroids"""
+        documents = [self._terms(text) for text in texts]
+        
+        document_frequency = Counter()
+        for terms in documents:
+            document_frequency.update(set(terms))
+        
+        # Keyword terms are always kept so every category has a seed
+        seed_vocabulary = {term for terms in self.seed_terms for term in terms}
+        terms = sorted(seed_vocabulary | {term for term, df in document_frequency.items() if df >= self.min_df})
+        self.vocabulary = {term: column for column, term in enumerate(terms)}
+        
+        total = len(documents)
+        self.idf = np.array([math.log((1 + total) / (1 + document_frequency[term])) + 1.0 for term in terms])
+        
+        seeds = np.zeros((len(self.categories), len(terms)))
+        for row, category_terms in enumerate(self.seed_terms):
+            for term in category_terms:
+                seeds[row, self.vocabulary[term]] = self.idf[self.vocabulary[term]]
+        seeds = self._normalise(seeds)
+        
+        # Pull each centroid towards the archive articles closest to its seed keywords
+        centroids = seeds
+        if documents and self.feedback > 0:
+            matrix = self._matrix(documents)
+            similarity = np.asarray(matrix @ seeds.T)
+            centroids = seeds.copy()
+            for row in range(len(self.categories)):
+                closest = np.argsort(similarity[:, row])[::-1][:self.feedback_docs]
+                closest = closest[similarity[closest, row] > 0]
+                if len(closest):
+                    mean = np.asarray(matrix[closest].mean(axis=0)).ravel()
+                    centroids[row] += self.feedback * self._normalise(mean[np.newaxis, :])[0]
+            centroids = self._normalise(centroids)
+        
+        self.centroids = centroids
+        self.fitted_documents = total
+    
+    def model(self) -> Dict:
+        """The fitted vocabulary, IDF weights and centroids as plain data, with only the non-zero centroid terms"""
+        rows, columns = np.nonzero(self.centroids)
+        return {
+            'terms': sorted(self.vocabulary, key=self.vocabulary.get),
+            'idf': self.idf.tolist(),
+            'centroids': [[int(row), int(column), float(self.centroids[row, column])]
+                          for row, column in zip(rows, columns)],
+            'fitted_documents': self.fitted_documents,
+        }
+    
+    def load_model(self, model: Dict):
+        """Restore a model saved with model() instead of fitting"""
+        self.vocabulary = {term: column for column, term in enumerate(model['terms'])}
+        self.idf = np.array(model['idf'], dtype=float)
+        self.centroids = np.zeros((len(self.categories), len(self.vocabulary)))
+        for row, column, value in model['centroids']:
+            self.centroids[row, column] = value
+        self.fitted_documents = model['fitted_documents']
+    
+    @staticmethod
+    def _normalise(rows: 'np.ndarray') -> 'np.ndarray':
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return rows / norms
+    
+    def score(self, texts: List[str]) -> List[float]:
+        """Score texts in [0, 1] as the best category-weighted cosine similarity"""
+        if not texts:
+            return []
+        documents = self._matrix([self._terms(text) for text in texts])
+        similarity = np.asarray(documents @ self.centroids.T)
+        return np.clip((similarity * self.weights).max(axis=1), 0.0, 1.0).tolist()
+
+SCORING_ENGINES = {
+    'tfidf': TfidfEngine,
+}
+
+def create_scoring_engine(name: str, keywords: Dict[str, List[str]],
+                          category_weights: Dict[str, float]) -> Optional[TfidfEngine]:
+    """Build the configured engine, or None to rank by the keyword score"""
+    if not name or name == 'keyword':
+        return None
+    if name not in SCORING_ENGINES:
+        print(f"Unknown scoring engine '{name}', ranking by keyword score")
+        return None
+    
+    try:
+        return SCORING_ENGINES[name](keywords, category_weights)
+    except ImportError as e:
+        print(f"{e}; ranking by keyword score")
+        return None
@@ -9,14 +9,33 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Auto-refresh functionality
     let autoRefreshInterval;
+    let changeStream;
     
     function startAutoRefresh() {
+        // Let the server push a notice when new articles are committed
+        if (window.EventSource) {
+            changeStream = new EventSource('/api/articles/changes/stream');
+            changeStream.addEventListener('changes', function(event) {
+                refreshStats();
+                // Re-scores and cleanups also advance the watermark; only new articles are worth a notice
+                const changes = JSON.parse(event.data);
+                if (changes.inserted > 0) {
+                    const label = changes.inserted === 1 ? '1 new article is' : changes.inserted + ' new articles are';
+                    showNotification(label + ' available. <a href="' + window.location.href + '" class="alert-link">Refresh</a>', 'success');
+                }
+            });
+            return;
+        }
+        
         autoRefreshInterval = setInterval(function() {
             refreshStats();
         }, 300000); // Refresh every 5 minutes
     }
     
     function stopAutoRefresh() {
+        if (changeStream) {
+            changeStream.close();
+        }
         if (autoRefreshInterval) {
             clearInterval(autoRefreshInterval);
         }
@@ -164,6 +183,28 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     };
     
+    // The footer's scheduler status is fetched, since the page around it may come from the cache
+    function refreshSchedulerStatus() {
+        const element = document.getElementById('nextSourcePoll');
+        if (!element) {
+            return;
+        }
+        fetch('/api/status')
+            .then(response => response.json())
+            .then(status => {
+                // next_run is 'YYYY-MM-DD HH:MM:SS' in UTC; shown as HH:MM DD/MM/YYYY
+                const match = /^(\d{4})-(\d{2})-(\d{2})[ T](\d{2}):(\d{2})/.exec(status.next_run || '');
+                element.textContent = match
+                    ? match[4] + ':' + match[5] + ' ' + match[3] + '/' + match[2] + '/' + match[1] + ' UTC'
+                    : 'Not scheduled';
+            })
+            .catch(error => {
+                console.error('Error refreshing scheduler status:', error);
+            });
+    }
+    
+    refreshSchedulerStatus();
+    
     // Start auto-refresh if on main page
     if (window.location.pathname === '/' || window.location.pathname === '') {
         startAutoRefresh();
@@ -0,0 +1,84 @@
+"""
+Query plans of the article listing, keyset, count and cleanup queries
+Each statement is captured as it runs and checked with EXPLAIN QUERY PLAN, so a schema
+or query change that drops an index or adds a temporary sort fails here
+"""
+import sqlite3
+import pytest
+from database import ConnectionPool, NewsDatabase
+
+@pytest.fixture
+def traced(tmp_path, monkeypatch):
+    """A fresh database and the list of statements run on it, with parameters expanded"""
+    statements = []
+    connect = ConnectionPool._connect
+    
+    def traced_connect(pool):
+        conn = connect(pool)
+        conn.set_trace_callback(statements.append)
+        return conn
+    
+    monkeypatch.setattr(ConnectionPool, '_connect', traced_connect)
+    db = NewsDatabase(str(tmp_path / 'plans.db'))
+    db.add_articles([{
+        'title': f'Article {i}', 'description': '', 'content': '', 'url': f'https://example.com/{i}',
+        'source': 'Example', 'category': 'news' if i % 2 else 'policy',
+        'published_date': f'2026-01-{i % 28 + 1:02d} 12:00:00', 'relevance_score': i % 10,
+        'keywords_matched': [],
+    } for i in range(50)])
+    statements.clear()
+    return db, statements
+
+def article_queries(statements, prefix):
+    """Captured statements that start with prefix and read the articles table"""
+    return [sql for sql in statements
+            if sql.lstrip().upper().startswith(prefix) and 'FROM articles' in sql]
+
+def query_plan(db, sql):
+    with db._connection() as conn:
+        conn.set_trace_callback(None)
+        rows = conn.execute('EXPLAIN QUERY PLAN ' + sql).fetchall()
+    return [row['detail'] for row in rows]
+
+def assert_indexed(db, queries):
+    assert queries
+    for sql in queries:
+        plan = query_plan(db, sql)
+        full_scans = [step for step in plan if step.startswith('SCAN articles') and 'INDEX' not in step]
+        assert not full_scans, f'{sql}\n{plan}'
+        temp_sorts = [step for step in plan if 'USE TEMP B-TREE' in step]
+        assert not temp_sorts, f'{sql}\n{plan}'
+
+FILTERS = [
+    {},
+    {'category': 'news'},
+    {'min_relevance': 5.0},
+    {'category': 'news', 'min_relevance': 5.0},
+]
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_listing(traced, filters):
+    db, statements = traced
+    db.get_articles(limit=10, offset=10, **filters)
+    db.get_articles_page(limit=10, include_total=True, **filters)
+    assert_indexed(db, article_queries(statements, 'SELECT'))
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_keyset(traced, filters):
+    db, statements = traced
+    first = db.get_articles_page(limit=5, days_back=3650, **filters)
+    second = db.get_articles_page(limit=5, days_back=3650, cursor=first['next_cursor'], **filters)
+    db.get_articles_page(limit=5, days_back=3650, cursor=second['prev_cursor'], direction='prev',
+                         include_total=True, **filters)
+    assert_indexed(db, article_queries(statements, 'SELECT'))
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_count(traced, filters):
+    db, statements = traced
+    db.get_articles_count(**filters)
+    assert_indexed(db, article_queries(statements, 'SELECT'))
+
+def test_cleanup(traced):
+    db, statements = traced
+    db.cleanup_old_articles(days=30)
+    assert_indexed(db, article_queries(statements, 'DELETE'))
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Update worker
+Runs the newsfeed updates queued in the jobs table, outside the web process,
+and queues a poll whenever a source's adaptive polling interval has elapsed
+"""
+
+import argparse
+import threading
+import time
+from typing import Dict, Optional
+import schedule
+import config
+from scheduler import NewsfeedScheduler
+
+class UpdateWorker:
+    """Claim queued jobs one at a time and run them, sending heartbeats while they run"""
+    
+    def __init__(self, scheduler: NewsfeedScheduler = None, poll_interval: float = config.JOB_POLL_INTERVAL):
+        self.scheduler = scheduler or NewsfeedScheduler()
+        self.database = self.scheduler.database
+        self.poll_interval = poll_interval
+        self.is_running = False
+        self.handlers = {
+            'update': self.scheduler.update_newsfeed,
+            'poll': lambda progress: self.scheduler.update_newsfeed(progress, due_only=True),
+            'signatures': lambda progress: {'signed': self.scheduler.scraper.deduplicator.backfill(progress=progress)},
+        }
+    
+    def run_job(self, job: Dict) -> Dict:
+        """Run one claimed job and record its outcome"""
+        handler = self.handlers.get(job['kind'])
+        if handler is None:
+            self.database.finish_job(job['id'], error=f"Unknown job kind '{job['kind']}'")
+            return {}
+        
+        # Keep the heartbeat going through long stages that report no progress
+        finished = threading.Event()
+        def heartbeat():
+            while not finished.wait(config.JOB_HEARTBEAT_INTERVAL):
+                self.database.update_job_progress(job['id'])
+        threading.Thread(target=heartbeat, daemon=True).start()
+        
+        started = time.monotonic()
+        try:
+            result = handler(progress=lambda message: self.database.update_job_progress(job['id'], message))
+        except Exception as e:
+            result = {'error': str(e)}
+        finally:
+            finished.set()
+        
+        result['seconds'] = round(time.monotonic() - started, 2)
+        error = result.pop('error', None)
+        self.database.finish_job(job['id'], result, error)
+        print(f"Job {job['id']} {'failed: ' + error if error else 'succeeded'} in {result['seconds']}s")
+        return result
+    
+    def run_pending(self) -> int:
+        """Run queued jobs until the queue is empty, returning how many ran"""
+        ran = 0
+        while True:
+            requeued = self.database.requeue_stale_jobs()
+            if requeued:
+                print(f"Requeued {requeued} jobs abandoned by a stopped worker")
+            
+            job = self.database.claim_next_job()
+            if job is None:
+                return ran
+            
+            print(f"Running job {job['id']} ({job['kind']}, requested {job['requests']} times, "
+                  f"attempt {job['attempts']})")
+            self.run_job(job)
+            ran += 1
+    
+    def enqueue_update(self) -> Dict:
+        """Queue an update, joining one that is already queued or running"""
+        job = self.database.enqueue_job('update')
+        print(f"{'Joined' if job['coalesced'] else 'Queued'} update job {job['id']}")
+        return job
+    
+    def enqueue_due_sources(self) -> Optional[Dict]:
+        """Queue a poll of the due sources if there are any"""
+        due = self.scheduler.due_sources()
+        if not due:
+            return None
+        
+        job = self.database.enqueue_job('poll')
+        if not job['coalesced']:
+            print(f"Queued poll job {job['id']} for {len(due)} due sources")
+        return job
+    
+    def enqueue_signature_backfill(self) -> Optional[Dict]:
+        """Queue signing of stored articles that predate near-duplicate detection, if there are any"""
+        if not self.database.get_unsigned_articles(limit=1):
+            return None
+        
+        job = self.database.enqueue_job('signatures')
+        print(f"{'Joined' if job['coalesced'] else 'Queued'} signature backfill job {job['id']}")
+        return job
+    
+    def run(self):
+        """Queue polls of sources as they fall due and run jobs as they arrive"""
+        schedule.every(config.POLL_CHECK_INTERVAL).seconds.do(self.enqueue_due_sources)
+        try:
+            self.enqueue_signature_backfill()
+            self.enqueue_due_sources()
+        except Exception as e:
+            print(f"Error queueing startup jobs: {e}")
+        self.is_running = True
+        print(f"Update worker started, polling every {self.poll_interval}s")
+        
+        failures = 0
+        while self.is_running:
+            try:
+                schedule.run_pending()
+                ran = self.run_pending()
+            except Exception as e:
+                # A locked or unreachable database must not stop the worker; back off and try again,
+                # a job it was running is requeued once its heartbeat goes stale
+                failures += 1
+                delay = min(self.poll_interval * 2 ** failures, config.JOB_MAX_BACKOFF)
+                print(f"Update worker error: {e}; retrying in {delay:g}s")
+                time.sleep(delay)
+                continue
+            
+            failures = 0
+            if not ran:
+                time.sleep(self.poll_interval)
+    
+    def stop(self):
+        """Stop after the current job"""
+        self.is_running = False
+
+def main():
+    """Run the update worker from the command line"""
+    parser = argparse.ArgumentParser(description='Run queued newsfeed updates')
+    parser.add_argument('--enqueue', action='store_true',
+                        help='queue an update before starting')
+    parser.add_argument('--once', action='store_true',
+                        help='run the queued jobs and exit instead of waiting for more')
+    args = parser.parse_args()
+    
+    worker = UpdateWorker()
+    if args.enqueue:
+        worker.enqueue_update()
+    
+    if args.once:
+        worker.run_pending()
+        return
+    
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        print("Shutting down update worker...")
+        worker.stop()
+
+if __name__ == '__main__':
+    main()